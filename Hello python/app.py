@@ -1,32 +1,199 @@
 from datetime import datetime
-from flask import Flask
+from html import escape
+from flask import Flask, Response, abort, request, send_file
+import math
 import os
 
+from greeting_log import (TIMESTAMP_FORMAT, LogSegments, LogWriter, RecentLog, SqliteLogStore, TextLogStore,
+                          TimestampCache, install_shutdown_hooks)
+
 app = Flask(__name__)
 
-Data_dir = '/app/data'
+Data_dir = os.environ.get('DATA_DIR', '/app/data')
 myfile = os.path.join(Data_dir,'greeting_log.txt')
+mydb = os.path.join(Data_dir,'greeting_log.db')
+
+BAD_RANGE = "since/until must look like 2024-01-31 13-45-00 or 2024-01-31T13:45:00"
+
+# Most requests in a busy second share the same timestamp string
+timestamps = TimestampCache(TIMESTAMP_FORMAT)
+
+# Where the log lives: "text" (greeting_log.txt) or "sqlite" (greeting_log.db, see migrate_log.py)
+LOG_BACKEND = os.environ.get('LOG_BACKEND', 'text')
+
+# How many log entries the page shows by default, and the most a client may ask for
+LOG_TAIL_LINES = int(os.environ.get('LOG_TAIL_LINES', 100))
+LOG_TAIL_MAX = int(os.environ.get('LOG_TAIL_MAX', 1000))
+# How far back a client may page. Skipped lines are still read (and a gzip
+# segment keeps them in memory) under the log lock, so this bounds each request.
+LOG_OFFSET_MAX = int(os.environ.get('LOG_OFFSET_MAX', 10000))
+
+# When buffered log lines reach the file: always, interval or shutdown
+LOG_DURABILITY = os.environ.get('LOG_DURABILITY', 'interval')
+LOG_FLUSH_MS = int(os.environ.get('LOG_FLUSH_MS', 50))
+LOG_BATCH_LINES = int(os.environ.get('LOG_BATCH_LINES', 1000))
+
+# Roll the log over at this size or age (0 turns a limit off) and keep this many old segments
+LOG_ROTATE_BYTES = int(os.environ.get('LOG_ROTATE_BYTES', 10 * 1024 * 1024))
+LOG_ROTATE_SECONDS = int(os.environ.get('LOG_ROTATE_SECONDS', 0))
+LOG_KEEP_SEGMENTS = int(os.environ.get('LOG_KEEP_SEGMENTS', 5))
+
+# Set when several worker processes append to the same log (see gunicorn.conf.py)
+LOG_SHARED = os.environ.get('LOG_SHARED') == '1'
+
+# How many seconds a line can land in the file after a newer one. Lines wait
+# up to LOG_FLUSH_MS in a worker's buffer while other workers' batches are
+# appended; the extra second covers timestamps taken just before a boundary.
+# Shared logs that only flush at shutdown have no bound, so time-range
+# queries scan every line.
+if LOG_SHARED and LOG_DURABILITY == 'shutdown':
+    LOG_MAX_SKEW = None
+else:
+    LOG_MAX_SKEW = 1 + math.ceil(LOG_FLUSH_MS / 1000)
+
+# Newest entries kept in memory to serve the page from. A worker only sees its
+# own appends, so with a shared log every page is read back from the file.
+LOG_RECENT_LINES = int(os.environ.get('LOG_RECENT_LINES', 0 if LOG_SHARED else LOG_TAIL_MAX))
 
 if not os.path.exists(Data_dir):
     os.makedirs(Data_dir)
 
-@app.route('/')
-def hello():
+if LOG_BACKEND == 'sqlite':
+    log_store = SqliteLogStore(mydb)
+else:
+    log_store = TextLogStore(myfile, LogSegments(myfile, LOG_ROTATE_BYTES, LOG_ROTATE_SECONDS, LOG_KEEP_SEGMENTS),
+                             LOG_MAX_SKEW)
+log_writer = LogWriter(log_store, LOG_DURABILITY, LOG_FLUSH_MS, LOG_BATCH_LINES)
+install_shutdown_hooks(log_writer)
+recent_log = RecentLog(LOG_RECENT_LINES)
+recent_log.warm(log_writer)
+
+
+# Characters per chunk when streaming the whole log
+LOG_STREAM_CHUNK = int(os.environ.get('LOG_STREAM_CHUNK', 64 * 1024))
+
+
+def render_log(lines):
+    return f"Log:<br><pre>{escape(''.join(lines), quote=False)}</pre>"
+
+
+def stream_log_page(chunk_size=LOG_STREAM_CHUNK):
+    """Yield the page for the whole log piece by piece instead of building it in memory.
+
+    Escaping works one character at a time, so chunks can be escaped independently.
+    """
+    yield "Log:<br><pre>"
+    for chunk in log_writer.iter_text(chunk_size):
+        yield escape(chunk, quote=False)
+    yield "</pre>"
+
+
+def log_window(args):
+    """Read the (limit, offset) paging parameters from a request's query arguments."""
+    limit = min(max(args.get('limit', LOG_TAIL_LINES, type=int), 0), LOG_TAIL_MAX)
+    offset = min(max(args.get('offset', 0, type=int), 0), LOG_OFFSET_MAX)
+    return limit, offset
+
+
+def parse_timestamp(value):
+    """Normalise a since/until argument (ISO 8601 or the log's own format) to the log format."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.strptime(value, TIMESTAMP_FORMAT)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def record_greeting():
     # return "hello Docker"
     mesaage = 'hello docker'
-    timestamp = datetime.now().strftime("%Y-%m-%d %H-%M-%S")
+    timestamp = timestamps.now()
 
-    with open(myfile,'a') as f:
-        f.write(f"{timestamp}:{mesaage}\n")
+    line = f"{timestamp}:{mesaage}"
+    log_writer.write(line)
+    recent_log.append(line)
 
-    log_content = ''
+
+def read_log_page(limit, offset):
+    """Render the page from the log files, for windows older than the in-memory buffer."""
     try:
-        with open(myfile,'r') as f:
-            log_content = f.read()
+        lines = log_writer.tail(limit, offset)
     except FileNotFoundError:
-        log_content = "No Prviouse Log Found..!"
+        lines = ["No Prviouse Log Found..!"]
+    return render_log(lines)
+
+
+def log_page(limit, offset):
+    page = recent_log.page(limit, offset, render_log)
+    if page is None:
+        page = read_log_page(limit, offset)
+    return page
+
+
+@app.route('/')
+def hello():
+    record_greeting()
+    limit, offset = log_window(request.args)
+    return log_page(limit, offset)
+
 
-    return f"Log:<br><pre>{log_content}</pre>"
+@app.route('/view')
+def view_log():
+    # Read-only version of "/" that pollers and proxies can revalidate cheaply
+    size, modified, pending = log_writer.stamp()
+    etag = f"{size:x}-{int(modified * 1000):x}-{pending:x}"
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        fresh = since is not None and int(modified) <= since.timestamp()
+
+    if fresh:
+        response = Response(status=304)
+    else:
+        response = Response(log_page(*log_window(request.args)))
+    response.set_etag(etag)
+    response.last_modified = int(modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/log/all')
+def full_log():
+    # Read-only page with every entry, rotated segments included, sent as it is read
+    return Response(stream_log_page(), mimetype='text/html')
+
+
+@app.route('/log.txt')
+def raw_log():
+    # The active log file as it is on disk. Range requests let a client fetch
+    # only the bytes added since its last offset; lines still in the write
+    # buffer show up after the next flush.
+    if LOG_BACKEND != 'text' or not os.path.exists(myfile):
+        abort(404)
+    return send_file(myfile, mimetype='text/plain', conditional=True, max_age=0)
+
+
+def read_log_range(args):
+    """Render the entries stamped between ?since= and ?until= (both inclusive).
+
+    Raises ValueError if either bound is not a timestamp.
+    """
+    since = parse_timestamp(args.get('since'))
+    until = parse_timestamp(args.get('until'))
+    limit, _ = log_window(args)
+    return render_log(log_writer.between(since, until, limit))
+
+
+@app.route('/log')
+def log_range():
+    # Read-only, unlike "/" this does not add a greeting
+    try:
+        return read_log_range(request.args)
+    except ValueError:
+        return BAD_RANGE, 400
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0',port=5000)
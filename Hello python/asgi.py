@@ -0,0 +1,68 @@
+import asyncio
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+from app import (BAD_RANGE, log_window, log_writer, read_log_page, read_log_range, record_greeting,
+                 recent_log, render_log)
+
+# ASGI entry point serving the same "/" and "/log" pages as app.py, e.g.
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+# Anything that can touch the disk runs in the default thread pool so it
+# never blocks the event loop.
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1')))
+    if scope['path'] == '/log':
+        try:
+            page = await asyncio.to_thread(read_log_range, args)
+        except ValueError:
+            await respond(send, 400, BAD_RANGE.encode())
+            return
+        await respond(send, 200, page.encode('utf-8'))
+        return
+    if scope['path'] != '/':
+        await respond(send, 404, b'Not Found')
+        return
+
+    if log_writer.durability == 'always':
+        await asyncio.to_thread(record_greeting)
+    else:
+        # Buffered writes only append to memory
+        record_greeting()
+
+    limit, offset = log_window(args)
+    page = recent_log.page(limit, offset, render_log)
+    if page is None:
+        page = await asyncio.to_thread(read_log_page, limit, offset)
+    await respond(send, 200, page.encode('utf-8'))
+
+
+async def respond(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'text/html; charset=utf-8'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.to_thread(log_writer.close)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
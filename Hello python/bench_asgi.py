@@ -0,0 +1,85 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# -------------------------------
+# Load benchmark: WSGI (Flask dev server) vs ASGI (uvicorn) on "/"
+# -------------------------------
+# Run from this directory:  python bench_asgi.py [requests_per_level]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCURRENCY = [1, 10, 100]
+
+SERVERS = {
+    "WSGI": [sys.executable, "-c", "import sys, app; app.app.run(port=int(sys.argv[1]))"],
+    "ASGI": [sys.executable, "-m", "uvicorn", "asgi:application", "--log-level", "warning", "--port"],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, port, data_dir):
+    env = dict(os.environ, DATA_DIR=data_dir)
+    proc = subprocess.Popen(command + [str(port)], cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"Server did not start: {command}")
+
+
+async def fetch(port):
+    """Send one GET / and return its latency in seconds."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /?limit=20 HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return time.perf_counter() - start
+
+
+async def run_load(port, concurrency, total):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def client():
+        for _ in remaining:
+            latencies.append(await fetch(port))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start), latencies
+
+
+def p99(latencies):
+    ordered = sorted(latencies)
+    return ordered[int(len(ordered) * 0.99) - 1]
+
+
+for name, command in SERVERS.items():
+    with tempfile.TemporaryDirectory() as data_dir:
+        port = free_port()
+        server = start_server(command, port, data_dir)
+        try:
+            for concurrency in CONCURRENCY:
+                rps, latencies = asyncio.run(run_load(port, concurrency, REQUESTS))
+                print(f"{name} {concurrency:>3} clients: {rps:8.1f} req/s, p99 {p99(latencies) * 1000:7.2f} ms")
+        finally:
+            server.terminate()
+            server.wait()
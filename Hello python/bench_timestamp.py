@@ -0,0 +1,37 @@
+import timeit
+from datetime import datetime
+
+from greeting_log import TimestampCache
+
+# -------------------------------
+# Timestamp formatting on the hello() hot path
+# -------------------------------
+
+FORMAT = "%Y-%m-%d %H-%M-%S"
+cache = TimestampCache(FORMAT)
+
+
+# 1. Format on every request (the old code path)
+def format_every_time():
+    return datetime.now().strftime(FORMAT)
+
+
+# 2. Reuse the string formatted for the current second
+def format_cached():
+    return cache.now()
+
+
+# -------------------------------
+# Benchmarking using timeit
+# -------------------------------
+
+# Number of simulated requests
+n = 1000000
+
+time_plain = timeit.timeit(format_every_time, number=n)
+print(f"strftime per request: {time_plain:.3f} seconds for {n} calls ({time_plain / n * 1e9:.0f} ns/call)")
+
+time_cached = timeit.timeit(format_cached, number=n)
+print(f"TimestampCache:       {time_cached:.3f} seconds for {n} calls ({time_cached / n * 1e9:.0f} ns/call)")
+
+print(f"Saved {(time_plain - time_cached) / n * 1e9:.0f} ns per request ({time_plain / time_cached:.1f}x faster)")
@@ -0,0 +1,829 @@
+import atexit
+import fcntl
+import gzip
+import json
+import mmap
+import os
+import queue
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
+
+TAIL_BLOCK_SIZE = 8192
+
+# Every log line starts with a "%Y-%m-%d %H-%M-%S" timestamp, which sorts as text
+TIMESTAMP_FORMAT = "%Y-%m-%d %H-%M-%S"
+TIMESTAMP_LEN = len('2000-01-01 00-00-00')
+
+# Durability modes for LogWriter:
+#   always   - every line is written to the file before the request returns
+#   interval - lines are flushed every flush_interval_ms or once max_batch lines are waiting
+#   shutdown - lines are flushed only when max_batch lines are waiting and on shutdown
+DURABILITY_MODES = ('always', 'interval', 'shutdown')
+
+
+class TimestampCache:
+    """Formats the wall clock at most once per second.
+
+    The cached (second, text) pair is replaced as a whole, so threads never see
+    half an update; each worker process simply keeps its own cache.
+    """
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self._cached = (None, '')
+
+    def now(self):
+        second = int(time.time())
+        cached = self._cached
+        if cached[0] != second:
+            cached = (second, datetime.fromtimestamp(second).strftime(self.fmt))
+            self._cached = cached
+        return cached[1]
+
+
+def _skip_lines_back(f, end, count):
+    """Offset where the `count` lines before `end` start (0 if there are fewer).
+
+    Only newlines are counted, so nothing is kept from the skipped lines.
+    """
+    pos = end
+    while pos > 0 and count > 0:
+        step = min(TAIL_BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        i = len(block)
+        while count > 0:
+            i = block.rfind(b'\n', 0, i)
+            if i == -1:
+                break
+            # The newline right before `end` closes the last line, it does not start one
+            if pos + i + 1 != end:
+                count -= 1
+        if count == 0:
+            return pos + i + 1
+    return 0
+
+
+def tail_lines(filename, limit, offset=0):
+    """Return up to `limit` lines that end `offset` lines before the end of the file.
+
+    The file is read backwards in fixed-size blocks, so the cost depends on
+    how many lines are asked for and not on how big the file has grown. The
+    `offset` lines are only counted, never kept.
+    """
+    if limit <= 0:
+        return []
+    blocks = []
+    newlines = 0
+    with open(filename, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        if offset > 0:
+            pos = _skip_lines_back(f, pos, offset)
+        # One extra newline is needed so the first line we keep is complete
+        while pos > 0 and newlines <= limit:
+            step = min(TAIL_BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            newlines += block.count(b'\n')
+            blocks.append(block)
+    lines = b''.join(reversed(blocks)).splitlines(keepends=True)
+    if pos > 0:
+        # Drop the partial line cut by the block boundary
+        lines = lines[1:]
+    return [line.decode('utf-8', errors='replace') for line in lines[-limit:]]
+
+
+def tail_gzip_lines(filename, limit):
+    """Return the last `limit` lines of a gzip file.
+
+    Gzip streams cannot be read backwards, so this decompresses the whole
+    segment but only ever keeps `limit` lines in memory.
+    """
+    if limit <= 0:
+        return []
+    with gzip.open(filename, 'rt', encoding='utf-8', errors='replace') as f:
+        return list(deque(f, maxlen=limit))
+
+
+def _line_start(mm, pos):
+    """Offset of the first line that starts at or after `pos`."""
+    if pos == 0:
+        return 0
+    newline = mm.find(b'\n', pos - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+
+def _bisect_lines(mm, key, after=False):
+    """Offset of the first line whose timestamp is >= `key` (> `key` with `after`)."""
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = _line_start(mm, mid)
+        stamp = mm[start:start + TIMESTAMP_LEN]
+        if start >= len(mm) or (stamp > key if after else stamp >= key):
+            hi = mid
+        else:
+            lo = mid + 1
+    return _line_start(mm, lo)
+
+
+def shift_stamp(stamp, seconds):
+    """Move a log timestamp by `seconds` (None stays None)."""
+    if not stamp:
+        return stamp
+    return (datetime.strptime(stamp, TIMESTAMP_FORMAT) + timedelta(seconds=seconds)).strftime(TIMESTAMP_FORMAT)
+
+
+def _in_range(stamp, since, until):
+    return (not since or stamp >= since) and (not until or stamp <= until)
+
+
+def range_lines(filename, since, until, limit, max_skew=0):
+    """Return up to `limit` lines stamped between `since` and `until` (inclusive, None for open).
+
+    Lines are appended in roughly time order: a line can land up to
+    `max_skew` seconds after a newer one (batches from several workers
+    interleave). Both ends are found by binary search over a memory map,
+    widened by that margin, and every line in between is checked against
+    the range. With max_skew=None the order is unknown and the whole file is scanned.
+    """
+    with open(filename, 'rb') as f:
+        if limit <= 0 or os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = 0, len(mm)
+            if max_skew is not None:
+                if since:
+                    start = _bisect_lines(mm, shift_stamp(since, -max_skew).encode())
+                if until:
+                    end = _bisect_lines(mm, shift_stamp(until, max_skew).encode(), after=True)
+            lines = []
+            while start < end and len(lines) < limit:
+                newline = mm.find(b'\n', start, end)
+                stop = end if newline == -1 else newline + 1
+                line = mm[start:stop].decode('utf-8', errors='replace')
+                if _in_range(line[:TIMESTAMP_LEN], since, until):
+                    lines.append(line)
+                start = stop
+    return lines
+
+
+def range_gzip_lines(filename, since, until, limit, max_skew=0):
+    """Like `range_lines`, but a gzip segment has to be scanned from the start."""
+    lines = []
+    stop_after = shift_stamp(until, max_skew) if max_skew is not None else None
+    with gzip.open(filename, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            stamp = line[:TIMESTAMP_LEN]
+            if stop_after and stamp > stop_after or len(lines) >= limit:
+                break
+            if _in_range(stamp, since, until):
+                lines.append(line)
+    return lines
+
+
+def _open_log_files(filename):
+    """Yield an open text stream for each file of a text log, oldest segment first."""
+    prefix = os.path.basename(filename) + '.'
+    directory = os.path.dirname(filename) or '.'
+    segments = sorted(name for name in os.listdir(directory)
+                      if name.startswith(prefix) and name[len(prefix):][:6].isdigit()
+                      and not name.endswith('.tmp'))
+    for name in segments + [os.path.basename(filename)]:
+        path = os.path.join(directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+                yield f
+        except FileNotFoundError:
+            continue
+
+
+def iter_log_lines(filename):
+    """Yield every line of a text log, oldest first, including rolled segments."""
+    for f in _open_log_files(filename):
+        yield from f
+
+
+def iter_log_chunks(filename, chunk_size):
+    """Yield a whole text log, oldest first, in chunks of at most `chunk_size` characters.
+
+    The text layer decodes incrementally, so a multi-byte character is never
+    split between two chunks.
+    """
+    for f in _open_log_files(filename):
+        yield from iter(lambda: f.read(chunk_size), '')
+
+
+class FileLock:
+    """Exclusive lock shared by threads in this process and by other processes.
+
+    Threads queue on a re-entrant lock; the process then takes an ``flock``
+    on `path`, so every worker appending to the same log goes one at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+class LogSegments:
+    """Rotates the active log file into numbered segments and keeps an index of them.
+
+    Rolled segments are named ``<log>.000001``, ``<log>.000002`` and so on, and
+    are gzip-compressed by a background thread so writers never wait on
+    compression. The index records how many lines each compressed segment
+    holds, which lets `tail` skip whole segments when paging back through the log.
+
+    Several processes may share one log: changes to the segments and the index
+    happen under `lock`, and each process reloads the index when it changes on disk.
+    """
+
+    def __init__(self, filename, max_bytes=0, max_age_seconds=0, keep=5):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.max_age = max_age_seconds
+        self.keep = keep
+        self.index_file = f"{filename}.index"
+        self.lock = FileLock(f"{filename}.lock")
+        self._segments = []
+        self._index_stamp = None
+        self._started = time.time()
+        with self.lock:
+            self._scan()
+            self._save_index()
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._compress_loop, name='log-compressor', daemon=True)
+        self._thread.start()
+        for entry in self._segments:
+            if not entry['compressed']:
+                self._jobs.put(entry['seq'])
+        self._jobs.put(None)
+
+    def should_rotate(self, size):
+        """Return True once the active file is over the size or age limit."""
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        if not self.max_age:
+            return False
+        self._refresh()
+        return time.time() - self._started >= self.max_age
+
+    def rotate(self):
+        """Roll the active file over to a new segment. Callers hold `lock` around this."""
+        with self.lock:
+            self._refresh()
+            seq = self._segments[-1]['seq'] + 1 if self._segments else 1
+            try:
+                os.rename(self.filename, self._path(seq, False))
+            except FileNotFoundError:
+                return
+            self._segments = self._segments + [{'seq': seq, 'lines': None, 'compressed': False}]
+            self._save_index()
+            self._started = time.time()
+        self._jobs.put(seq)
+        self._jobs.put(None)
+
+    def tail(self, limit, offset=0):
+        """Return up to `limit` lines ending `offset` lines before the end of the whole log."""
+        if limit <= 0:
+            return []
+        self._refresh()
+        older = [(entry['seq'], entry['lines'], entry['compressed']) for entry in reversed(self._segments)]
+        sources = [(None, None, False)] + older
+        chunks = []
+        found = False
+        for seq, count, compressed in sources:
+            if limit <= 0:
+                break
+            if count is not None and count <= offset:
+                # The whole segment is newer than the window, so it is never opened
+                offset -= count
+                found = True
+                continue
+            try:
+                lines = self._tail_segment(seq, compressed, limit + offset)
+            except FileNotFoundError:
+                continue
+            found = True
+            if len(lines) <= offset:
+                offset -= len(lines)
+                continue
+            kept = lines[:len(lines) - offset][-limit:]
+            offset = 0
+            limit -= len(kept)
+            chunks.append(kept)
+        if not found:
+            raise FileNotFoundError(self.filename)
+        return [line for chunk in reversed(chunks) for line in chunk]
+
+    def between(self, since, until, limit, max_skew=0):
+        """Return up to `limit` lines stamped between `since` and `until`, in log order.
+
+        `max_skew` is as for `range_lines`.
+        """
+        self._refresh()
+        sources = [(entry['seq'], entry['compressed'], entry.get('first'), entry.get('last'))
+                   for entry in self._segments] + [(None, False, None, None)]
+        if max_skew is not None:
+            # A segment's first/last lines can be this far from its oldest/newest ones
+            early, late = shift_stamp(since, -max_skew), shift_stamp(until, max_skew)
+        lines = []
+        for seq, compressed, first, last in sources:
+            if len(lines) >= limit:
+                break
+            if first is not None and max_skew is not None and (early and last < early or late and first > late):
+                # The index says the segment is entirely outside the range
+                continue
+            wanted = limit - len(lines)
+            try:
+                if compressed:
+                    found = range_gzip_lines(self._path(seq, True), since, until, wanted, max_skew)
+                else:
+                    try:
+                        found = range_lines(self._path(seq, False), since, until, wanted, max_skew)
+                    except FileNotFoundError:
+                        if seq is None:
+                            raise
+                        found = range_gzip_lines(self._path(seq, True), since, until, wanted, max_skew)
+            except FileNotFoundError:
+                continue
+            lines.extend(found)
+        return lines
+
+    def close(self):
+        """Wait for queued compressions to finish."""
+        self._jobs.join()
+
+    def _path(self, seq, compressed):
+        if seq is None:
+            return self.filename
+        path = f"{self.filename}.{seq:06d}"
+        return f"{path}.gz" if compressed else path
+
+    def _tail_segment(self, seq, compressed, limit):
+        if compressed:
+            return tail_gzip_lines(self._path(seq, True), limit)
+        try:
+            return tail_lines(self._path(seq, False), limit)
+        except FileNotFoundError:
+            if seq is None:
+                raise
+            # Compressed since the index was read
+            return tail_gzip_lines(self._path(seq, True), limit)
+
+    def _refresh(self):
+        """Reload the index if another process has rewritten it."""
+        try:
+            st = os.stat(self.index_file)
+        except FileNotFoundError:
+            return
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if stamp == self._index_stamp:
+            return
+        try:
+            with open(self.index_file) as f:
+                segments = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self._segments = segments
+        self._index_stamp = stamp
+        if segments:
+            # A rolled segment was last written when the log was rotated
+            for compressed in (segments[-1]['compressed'], not segments[-1]['compressed']):
+                try:
+                    self._started = os.stat(self._path(segments[-1]['seq'], compressed)).st_mtime
+                    break
+                except FileNotFoundError:
+                    pass
+
+    def _scan(self):
+        """Rebuild the index from the index file and the segments found on disk."""
+        self._refresh()
+        segments = list(self._segments)
+        known = {entry['seq'] for entry in segments}
+        prefix = os.path.basename(self.filename) + '.'
+        for name in os.listdir(os.path.dirname(self.filename) or '.'):
+            suffix = name[len(prefix):]
+            if not name.startswith(prefix) or not suffix[:6].isdigit() or name.endswith('.tmp'):
+                continue
+            seq = int(suffix[:6])
+            if seq not in known:
+                segments.append({'seq': seq, 'lines': None, 'compressed': suffix.endswith('.gz')})
+                known.add(seq)
+        segments = [entry for entry in segments
+                    if os.path.exists(self._path(entry['seq'], entry['compressed']))
+                    or os.path.exists(self._path(entry['seq'], not entry['compressed']))]
+        for entry in segments:
+            if not os.path.exists(self._path(entry['seq'], entry['compressed'])):
+                entry['compressed'] = not entry['compressed']
+        self._segments = sorted(segments, key=lambda entry: entry['seq'])
+
+    def _save_index(self):
+        tmp = f"{self.index_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._segments, f)
+        os.replace(tmp, self.index_file)
+        st = os.stat(self.index_file)
+        self._index_stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _compress_loop(self):
+        while True:
+            seq = self._jobs.get()
+            try:
+                if seq is None:
+                    self._prune()
+                else:
+                    self._compress(seq)
+            finally:
+                self._jobs.task_done()
+
+    def _compress(self, seq):
+        src = self._path(seq, False)
+        dst = self._path(seq, True)
+        # Other workers, or another LogSegments in this process, may be compressing
+        # the same segment after a restart
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        lines = 0
+        first = last = None
+        try:
+            with open(src, 'rb') as f_in, gzip.open(tmp, 'wb') as f_out:
+                for block in iter(lambda: f_in.read(1024 * 1024), b''):
+                    if first is None:
+                        first = block[:TIMESTAMP_LEN].decode('utf-8', errors='replace')
+                    lines += block.count(b'\n')
+                    f_out.write(block)
+            last = ''.join(tail_lines(src, 1))[:TIMESTAMP_LEN] or None
+        except FileNotFoundError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self.lock:
+            self._refresh()
+            if not os.path.exists(src):
+                os.remove(tmp)
+                return
+            os.replace(tmp, dst)
+            self._segments = [dict(entry, lines=lines, compressed=True, first=first, last=last)
+                              if entry['seq'] == seq else entry
+                              for entry in self._segments]
+            self._save_index()
+            os.remove(src)
+
+    def _prune(self):
+        with self.lock:
+            self._refresh()
+            expired = self._segments[:max(len(self._segments) - self.keep, 0)]
+            if not expired:
+                return
+            self._segments = self._segments[len(expired):]
+            self._save_index()
+            for entry in expired:
+                for compressed in (True, False):
+                    try:
+                        os.remove(self._path(entry['seq'], compressed))
+                    except FileNotFoundError:
+                        pass
+
+
+class TextLogStore:
+    """The plain-text greeting log, one "<timestamp>:<message>" line per entry."""
+
+    def __init__(self, filename, segments=None, max_skew=1):
+        self.filename = filename
+        # Optional LogSegments that rotates the file and reads across rolled segments
+        self.segments = segments
+        # Seconds a line may land after a newer one; None if there is no bound (see range_lines)
+        self.max_skew = max_skew
+        # Serialises appends and rotation with other processes writing the same log
+        self.lock = segments.lock if segments is not None else FileLock(f"{filename}.lock")
+
+    def append(self, lines):
+        data = ''.join(f"{line}\n" for line in lines).encode('utf-8')
+        with self.lock:
+            fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # The whole batch goes at the end of the file, never between another worker's lines
+                while data:
+                    data = data[os.write(fd, data):]
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if self.segments is not None and self.segments.should_rotate(size):
+                self.segments.rotate()
+
+    def tail(self, limit, offset=0):
+        with self.lock:
+            if self.segments is not None:
+                return self.segments.tail(limit, offset)
+            return tail_lines(self.filename, limit, offset)
+
+    def iter_text(self, chunk_size):
+        """Yield the whole log, oldest first, in chunks of at most `chunk_size` characters."""
+        return iter_log_chunks(self.filename, chunk_size)
+
+    def stat(self):
+        """Return (size in bytes, mtime) of the active file."""
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return 0, 0.0
+        return st.st_size, st.st_mtime
+
+    def between(self, since, until, limit):
+        with self.lock:
+            if self.segments is not None:
+                return self.segments.between(since, until, limit, self.max_skew)
+            try:
+                return range_lines(self.filename, since, until, limit, self.max_skew)
+            except FileNotFoundError:
+                return []
+
+    def close(self):
+        if self.segments is not None:
+            self.segments.close()
+
+
+class SqliteLogStore:
+    """Greeting log kept in an SQLite database in WAL mode, indexed by timestamp.
+
+    Time-range queries walk the timestamp index, so they cost O(log n) no
+    matter how long the log is, and reads go through SQLite's memory map.
+    Each thread gets its own connection; WAL lets readers run alongside the writer.
+    """
+
+    def __init__(self, filename, mmap_size=256 * 1024 * 1024):
+        self.filename = filename
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        conn = self._connection()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS greetings (
+                    id INTEGER PRIMARY KEY,
+                    ts TEXT NOT NULL,
+                    message TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS greetings_ts ON greetings (ts)')
+
+    def append(self, lines):
+        rows = [(ts, message) for ts, _, message in (line.partition(':') for line in lines)]
+        conn = self._connection()
+        with conn:
+            conn.executemany('INSERT INTO greetings (ts, message) VALUES (?, ?)', rows)
+
+    def tail(self, limit, offset=0):
+        rows = self._connection().execute(
+            'SELECT ts, message FROM greetings ORDER BY id DESC LIMIT ? OFFSET ?', (limit, offset)).fetchall()
+        return [f"{ts}:{message}\n" for ts, message in reversed(rows)]
+
+    def between(self, since, until, limit):
+        rows = self._connection().execute(
+            'SELECT ts, message FROM greetings WHERE ts >= ? AND ts <= ? ORDER BY ts, id LIMIT ?',
+            (since or '', until or '\uffff', limit)).fetchall()
+        return [f"{ts}:{message}\n" for ts, message in rows]
+
+    def iter_text(self, chunk_size):
+        """Yield the whole log, oldest first, a batch of rows of about `chunk_size` characters at a time."""
+        cursor = self._connection().execute('SELECT ts, message FROM greetings ORDER BY id')
+        # Lines are about 30 characters long
+        rows_per_chunk = max(chunk_size // 32, 1)
+        try:
+            while True:
+                rows = cursor.fetchmany(rows_per_chunk)
+                if not rows:
+                    return
+                yield ''.join(f"{ts}:{message}\n" for ts, message in rows)
+        finally:
+            cursor.close()
+
+    def stat(self):
+        """Return (size in bytes, mtime) of the database and its write-ahead log."""
+        size, mtime = 0, 0.0
+        for path in (self.filename, f"{self.filename}-wal"):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime)
+        return size, mtime
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            self._local.conn = conn
+        return conn
+
+
+class LogWriter:
+    """Collects log lines in memory and appends them to the file in batches."""
+
+    def __init__(self, store, durability='interval', flush_interval_ms=50, max_batch=1000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        # TextLogStore or SqliteLogStore the batches are written to
+        self.store = store
+        self.durability = durability
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._buffer = []
+        self._last_buffered = 0.0
+        self._cond = threading.Condition()
+        # Held while a batch moves from the buffer to the file, so batches stay in order
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        if durability != 'always':
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, line):
+        """Queue one line (without the trailing newline) for the log."""
+        if self.durability == 'always' or self._closed:
+            with self._write_lock:
+                self.store.append([line])
+            return
+        with self._cond:
+            self._buffer.append(line)
+            self._last_buffered = time.time()
+            if len(self._buffer) >= self.max_batch:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything buffered so far to the file."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                self.store.append(batch)
+
+    def tail(self, limit, offset=0):
+        """Return the last lines of the log, including ones still in the buffer."""
+        if limit <= 0:
+            return []
+        with self._write_lock:
+            with self._cond:
+                pending = len(self._buffer)
+                end = pending - offset
+                buffered = self._buffer[max(end - limit, 0):max(end, 0)]
+            lines = [f"{line}\n" for line in buffered]
+            if len(lines) < limit:
+                try:
+                    lines = self.store.tail(limit - len(lines), max(offset - pending, 0)) + lines
+                except FileNotFoundError:
+                    if not lines:
+                        raise
+        return lines
+
+    def stamp(self):
+        """Return (size, mtime, pending) describing the current state of the log.
+
+        `pending` counts lines still in the buffer; it only changes together
+        with the store's size or the mtime, which then covers buffered lines too.
+        """
+        with self._cond:
+            pending = len(self._buffer)
+            last_buffered = self._last_buffered
+        size, mtime = self.store.stat()
+        if pending:
+            mtime = max(mtime, last_buffered)
+        return size, mtime, pending
+
+    def iter_text(self, chunk_size):
+        """Yield the whole stored log in bounded chunks, after flushing the buffer."""
+        self.flush()
+        return self.store.iter_text(chunk_size)
+
+    def between(self, since, until, limit):
+        """Return up to `limit` lines stamped between `since` and `until`, in log order."""
+        with self._write_lock:
+            with self._cond:
+                pending = [f"{line}\n" for line in self._buffer
+                           if (not since or line[:TIMESTAMP_LEN] >= since)
+                           and (not until or line[:TIMESTAMP_LEN] <= until)]
+            return (self.store.between(since, until, limit) + pending)[:limit]
+
+    def close(self):
+        """Stop the background thread and drain the buffer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.store.close()
+
+    def _run(self):
+        timeout = self.flush_interval if self.durability == 'interval' else None
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.max_batch:
+                    self._cond.wait(timeout)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+
+class RecentLog:
+    """Ring buffer of the newest log lines, so the page can be served without disk reads.
+
+    The last rendered page is kept along with the buffer version it was built
+    from, and is only rebuilt once new lines have been appended.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._version = 0
+        # True while the buffer holds every line in the log
+        self._complete = capacity > 0
+        self._cached_key = None
+        self._cached_page = None
+
+    def warm(self, writer):
+        """Fill the buffer from the tail of the log behind `writer`."""
+        try:
+            lines = writer.tail(self.capacity + 1)
+        except FileNotFoundError:
+            lines = []
+        with self._lock:
+            self._lines.clear()
+            self._lines.extend(lines)
+            self._complete = 0 < self.capacity and len(lines) <= self.capacity
+            self._version += 1
+
+    def append(self, line):
+        """Add one line (without the trailing newline) to the buffer."""
+        with self._lock:
+            if len(self._lines) == self.capacity:
+                self._complete = False
+            self._lines.append(f"{line}\n")
+            self._version += 1
+
+    def page(self, limit, offset, render):
+        """Return `render(lines)` for the requested window, or None if it is not in the buffer."""
+        with self._lock:
+            key = (self._version, limit, offset)
+            if key == self._cached_key:
+                return self._cached_page
+            size = len(self._lines)
+            if limit + offset > size and not self._complete:
+                return None
+            end = max(size - offset, 0)
+            start = max(end - limit, 0)
+            lines = list(islice(self._lines, start, end))
+        page = render(lines)
+        with self._lock:
+            if key[0] == self._version:
+                self._cached_key, self._cached_page = key, page
+        return page
+
+
+def install_shutdown_hooks(writer):
+    """Drain `writer` at interpreter exit and when the process gets SIGTERM."""
+    atexit.register(writer.close)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    # Leave handlers installed by a process manager alone
+    if signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None):
+        # SystemExit unwinds normally, so the atexit hook above does the drain
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
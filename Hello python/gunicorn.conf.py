@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+# Production launcher with pre-forked workers:
+#   gunicorn -c gunicorn.conf.py app:app
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Each worker imports the app after the fork, so it starts its own log writer thread
+preload_app = False
+
+# Workers append to the same greeting_log.txt
+if workers > 1:
+    raw_env = ['LOG_SHARED=1']
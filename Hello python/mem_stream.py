@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+# -------------------------------
+# Peak memory of the streamed /log/all page vs building the page in one string
+# -------------------------------
+# Run from this directory:  python mem_stream.py
+
+data_dir = tempfile.mkdtemp()
+os.environ['DATA_DIR'] = data_dir
+os.environ['LOG_RECENT_LINES'] = '0'
+
+import app  # noqa: E402  (reads DATA_DIR at import)
+
+LINE = "2024-01-01 00-00-00:hello docker <&>\n"
+
+
+# -------------------------------
+# Ways of producing the page
+# -------------------------------
+def build_whole_page():
+    """What hello() used to do: read everything and format one string."""
+    with open(app.myfile) as f:
+        log_content = f.read()
+    return len(f"Log:<br><pre>{log_content}</pre>")
+
+
+def stream_page():
+    """Consume the streamed page the way a WSGI server would."""
+    return sum(len(piece) for piece in app.stream_log_page())
+
+
+def peak_memory(func):
+    tracemalloc.start()  # Start tracking memory
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()  # Stop tracking memory
+    return peak
+
+
+# -------------------------------
+# Track memory usage for growing logs
+# -------------------------------
+streamed_peaks = []
+for megabytes in (1, 10, 50):
+    with open(app.myfile, 'w') as f:
+        f.write(LINE * (megabytes * 1024 * 1024 // len(LINE)))
+    whole = peak_memory(build_whole_page)
+    streamed = peak_memory(stream_page)
+    streamed_peaks.append(streamed)
+    print(f"{megabytes:>3} MB log: whole page peak {whole / 1024:10.2f} KB, "
+          f"streamed peak {streamed / 1024:8.2f} KB")
+
+# The streamed peak must not grow with the log
+assert max(streamed_peaks) - min(streamed_peaks) < 64 * 1024, "streaming peak grew with the log size"
+print("Streamed peak memory stays bounded regardless of log size.")
+
+app.log_writer.close()
+shutil.rmtree(data_dir)
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+from greeting_log import SqliteLogStore, iter_log_lines
+
+# -------------------------------
+# Copy the text greeting log into the SQLite backend
+# -------------------------------
+# python migrate_log.py [--append] [greeting_log.txt] [greeting_log.db]
+# Rolled segments (greeting_log.txt.000001[.gz], ...) are copied first, oldest
+# to newest. Start the app with LOG_BACKEND=sqlite afterwards.
+# A database that already has entries is refused, since copying again would
+# duplicate them; --append adds the text log after them anyway.
+
+BATCH = 10000
+
+
+def migrate(src, dst, append=False):
+    """Copy every entry of the text log `src` into the SQLite log `dst`; returns how many.
+
+    Raises ValueError if `dst` already has entries, unless `append` is set.
+    """
+    store = SqliteLogStore(dst)
+    if not append and store.tail(1):
+        store.close()
+        raise ValueError(f"{dst} already has entries; pass --append to add {src} after them")
+    batch = []
+    total = 0
+    for line in iter_log_lines(src):
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        batch.append(line)
+        if len(batch) >= BATCH:
+            store.append(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        store.append(batch)
+        total += len(batch)
+    store.close()
+    return total
+
+
+if __name__ == "__main__":
+    data_dir = os.environ.get('DATA_DIR', '/app/data')
+    append = '--append' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--append']
+    src = args[0] if len(args) > 0 else os.path.join(data_dir, 'greeting_log.txt')
+    dst = args[1] if len(args) > 1 else os.path.join(data_dir, 'greeting_log.db')
+    start = time.time()
+    try:
+        total = migrate(src, dst, append)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Copied {total} entries from {src} to {dst} in {time.time() - start:.2f} seconds")
@@ -0,0 +1,141 @@
+import gzip
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from greeting_log import LogSegments, LogWriter, TextLogStore
+
+# -------------------------------
+# Stress test: many processes appending to one greeting log
+# -------------------------------
+# Run from this directory:  python stress_workers.py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROCESSES = 8
+LINES_PER_PROCESS = 2000
+
+
+def make_line(worker, i):
+    # Every 100th line is longer than PIPE_BUF, where plain appends stop being atomic
+    size = 5000 if i % 100 == 0 else i % 50
+    return f"{worker}:{i}:{size}:" + "x" * size
+
+
+def append_lines(filename, worker, durability):
+    store = TextLogStore(filename, LogSegments(filename, max_bytes=256 * 1024, keep=1000))
+    writer = LogWriter(store, durability, flush_interval_ms=1, max_batch=50)
+    for i in range(LINES_PER_PROCESS):
+        writer.write(make_line(worker, i))
+    writer.close()
+
+
+def read_all_lines(filename):
+    """Return every line in the active log and its rolled segments."""
+    lines = []
+    directory = os.path.dirname(filename)
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.gz'):
+            with gzip.open(path, 'rt') as f:
+                lines.extend(f)
+        elif name == os.path.basename(filename) or name[-6:].isdigit():
+            with open(path) as f:
+                lines.extend(f)
+    return lines
+
+
+class TestConcurrentAppends(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp, 'greeting_log.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_workers(self, durability):
+        workers = [multiprocessing.Process(target=append_lines, args=(self.log_file, w, durability))
+                   for w in range(PROCESSES)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+    def assert_all_lines_intact(self):
+        lines = read_all_lines(self.log_file)
+        seen = set()
+        for line in lines:
+            self.assertTrue(line.endswith("\n"), f"torn line: {line[:60]!r}")
+            worker, i, size, payload = line.rstrip("\n").split(":")
+            self.assertEqual(payload, "x" * int(size), f"torn line: {line[:60]!r}")
+            self.assertNotIn((worker, i), seen, "duplicated line")
+            seen.add((worker, i))
+        self.assertEqual(len(seen), PROCESSES * LINES_PER_PROCESS, "lost lines")
+
+    def test_batched_appends_with_rotation(self):
+        """Batched writers in separate processes, rotating as they go."""
+        self.run_workers('interval')
+        self.assert_all_lines_intact()
+        self.assertTrue(any(name.endswith('.gz') for name in os.listdir(self.tmp)))
+
+    def test_per_request_appends(self):
+        """One append per line from every process."""
+        self.run_workers('always')
+        self.assert_all_lines_intact()
+
+
+@unittest.skipUnless(shutil.which('gunicorn'), "gunicorn is not installed")
+class TestGunicornWorkers(unittest.TestCase):
+
+    REQUESTS = 2000
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        env = dict(os.environ, DATA_DIR=self.tmp, WEB_CONCURRENCY='4')
+        self.server = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{self.port}', 'app:app'],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{self.port}/?limit=0").read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.server.kill()
+        self.fail("gunicorn did not start")
+
+    def tearDown(self):
+        if self.server.poll() is None:
+            self.server.terminate()
+            self.server.wait()
+        shutil.rmtree(self.tmp)
+
+    def test_no_lost_or_torn_lines(self):
+        """Every request served by any worker leaves exactly one whole line."""
+        url = f"http://127.0.0.1:{self.port}/?limit=0"
+        with ThreadPoolExecutor(32) as pool:
+            list(pool.map(lambda _: urllib.request.urlopen(url).read(), range(self.REQUESTS)))
+        # SIGTERM lets every worker drain its buffer
+        self.server.terminate()
+        self.server.wait()
+        lines = read_all_lines(os.path.join(self.tmp, 'greeting_log.txt'))
+        # One extra request was made while waiting for startup
+        self.assertEqual(len(lines), self.REQUESTS + 1)
+        for line in lines:
+            self.assertRegex(line, r"^\d{4}-\d\d-\d\d \d\d-\d\d-\d\d:hello docker\n$")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+# app.py reads its settings when it is imported
+DATA_DIR = tempfile.mkdtemp()
+os.environ['DATA_DIR'] = DATA_DIR
+os.environ['LOG_BACKEND'] = 'text'
+os.environ['LOG_DURABILITY'] = 'always'
+
+import app
+
+# -------------------------------
+# Flask test-client tests for the conditional and range endpoints
+# -------------------------------
+# Run from this directory:  python -m unittest test_app
+
+
+def tearDownModule():
+    app.log_writer.close()
+    shutil.rmtree(DATA_DIR)
+
+
+class TestViewRevalidation(unittest.TestCase):
+    """/view answers 304 while the log is unchanged and a fresh page once it grows."""
+
+    def setUp(self):
+        self.client = app.app.test_client()
+        self.client.get('/')
+
+    def test_not_modified_on_matching_etag(self):
+        first = self.client.get('/view')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('hello docker', first.get_data(as_text=True))
+        etag = first.headers['ETag']
+
+        again = self.client.get('/view', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.get_data(), b'')
+        self.assertEqual(again.headers['ETag'], etag)
+
+    def test_new_write_changes_etag(self):
+        etag = self.client.get('/view').headers['ETag']
+        self.client.get('/')
+
+        after = self.client.get('/view', headers={'If-None-Match': etag})
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after.headers['ETag'], etag)
+        self.assertIn('hello docker', after.get_data(as_text=True))
+
+
+class TestLogWindow(unittest.TestCase):
+    """?limit= and ?offset= are both clamped, so a request never pages through the whole log."""
+
+    def window(self, query):
+        with app.app.test_request_context(query):
+            return app.log_window(app.request.args)
+
+    def test_clamped(self):
+        self.assertEqual(self.window('/?limit=5&offset=7'), (5, 7))
+        self.assertEqual(self.window('/?limit=-5&offset=-7'), (0, 0))
+        self.assertEqual(self.window('/?limit=100000000&offset=100000000'), (app.LOG_TAIL_MAX, app.LOG_OFFSET_MAX))
+
+    def test_far_offset_page(self):
+        client = app.app.test_client()
+        response = client.get('/view?limit=1&offset=100000000')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<pre></pre>', response.get_data(as_text=True))
+
+
+class TestRawLogRange(unittest.TestCase):
+    """/log.txt serves only the bytes after a client's last offset."""
+
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def test_open_ended_range(self):
+        self.client.get('/')
+        offset = os.path.getsize(app.myfile)
+        self.client.get('/')
+        with open(app.myfile, 'rb') as f:
+            data = f.read()
+
+        response = self.client.get('/log.txt', headers={'Range': f'bytes={offset}-'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), data[offset:])
+        self.assertEqual(response.headers['Content-Range'], f'bytes {offset}-{len(data) - 1}/{len(data)}')
+        self.assertTrue(response.get_data(as_text=True).endswith(':hello docker\n'))
+
+
+if __name__ == "__main__":
+    unittest.main()
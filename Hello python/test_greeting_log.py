@@ -0,0 +1,225 @@
+import os
+import random
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+import greeting_log
+from greeting_log import LogSegments, TextLogStore, iter_log_lines, tail_lines
+
+# -------------------------------
+# Unit tests for the greeting log stores
+# -------------------------------
+# Run from this directory:  python -m unittest test_greeting_log
+
+
+def stamp(second):
+    return f"2024-01-01 00-00-{second:02d}"
+
+
+class TestTailLines(unittest.TestCase):
+    """tail_lines(limit, offset) against a plain list, with blocks smaller than a line."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp, 'greeting_log.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def check(self, lines):
+        with open(self.log_file, 'w') as f:
+            f.write(''.join(lines))
+        total = len(lines)
+        for block_size in (1, 5, 64, 8192):
+            for limit in (0, 1, 3, total):
+                for offset in (0, 1, 4, total - 1, total, total + 2):
+                    with self.subTest(block_size=block_size, limit=limit, offset=offset), \
+                            mock.patch.object(greeting_log, 'TAIL_BLOCK_SIZE', block_size):
+                        end = max(total - offset, 0)
+                        expected = lines[max(end - limit, 0):end] if limit > 0 else []
+                        self.assertEqual(tail_lines(self.log_file, limit, offset), expected)
+
+    def test_offset_window(self):
+        self.check([f"{stamp(i % 60)}:greeting {'x' * (i % 13)}\n" for i in range(40)])
+
+    def test_blank_and_unterminated_lines(self):
+        self.check(["first\n", "\n", "\n", "middle\n", "\n", "last without newline"])
+
+    def test_skipped_lines_are_not_kept(self):
+        # Paging far back only holds the blocks of the window itself
+        with open(self.log_file, 'w') as f:
+            f.writelines(f"{stamp(i % 60)}:greeting {i}\n" for i in range(20000))
+        tracemalloc.start()
+        try:
+            lines = tail_lines(self.log_file, 2, 19000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual([line.split(':')[1] for line in lines], ["greeting 998\n", "greeting 999\n"])
+        self.assertLess(peak, 4 * greeting_log.TAIL_BLOCK_SIZE)
+
+
+class TestOutOfOrderBatches(unittest.TestCase):
+    """Batches from several workers can land slightly out of timestamp order."""
+
+    # Worker A flushes :00 and :01 lines, then worker B's older :00 batch lands
+    SECONDS = [0, 1, 1, 0, 2]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp, 'greeting_log.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def lines(self, *indexes):
+        return [f"{stamp(self.SECONDS[i])}:line{i}\n" for i in indexes]
+
+    def fill(self, store):
+        for i, second in enumerate(self.SECONDS):
+            store.append([f"{stamp(second)}:line{i}"])
+
+    def assert_ranges(self, store):
+        self.assertEqual(store.between(None, stamp(0), 100), self.lines(0, 3))
+        self.assertEqual(store.between(stamp(1), stamp(1), 100), self.lines(1, 2))
+        self.assertEqual(store.between(stamp(1), None, 100), self.lines(1, 2, 4))
+        self.assertEqual(store.between(stamp(0), stamp(0), 1), self.lines(0))
+
+    def test_active_file(self):
+        for max_skew in (1, None):
+            with self.subTest(max_skew=max_skew):
+                store = TextLogStore(self.log_file, max_skew=max_skew)
+                self.fill(store)
+                self.assert_ranges(store)
+                os.remove(self.log_file)
+
+    def test_compressed_segments(self):
+        # Every line goes to its own segment, so the range spans gzip files and the index
+        segments = LogSegments(self.log_file, max_bytes=1, keep=100)
+        store = TextLogStore(self.log_file, segments)
+        self.fill(store)
+        segments.close()
+        self.assertTrue(any(name.endswith('.gz') for name in os.listdir(self.tmp)))
+        self.assert_ranges(store)
+
+    def test_long_gzip_segment(self):
+        segments = LogSegments(self.log_file, keep=100)
+        store = TextLogStore(self.log_file, segments)
+        self.fill(store)
+        segments.rotate()
+        segments.close()
+        self.assert_ranges(store)
+
+
+class TestLogSegments(unittest.TestCase):
+    """Rotation, compression, pruning and cross-segment reads, checked against a plain list."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp, 'greeting_log.txt')
+        self.reference = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def open_store(self, max_bytes=300, keep=1000):
+        segments = LogSegments(self.log_file, max_bytes=max_bytes, keep=keep)
+        return TextLogStore(self.log_file, segments), segments
+
+    def write(self, store, count, rng):
+        """Append `count` lines in batches of random size, one second apart."""
+        written = 0
+        while written < count:
+            batch = []
+            for _ in range(min(rng.randint(1, 7), count - written)):
+                n = len(self.reference)
+                line = f"2024-01-01 {n // 3600 % 24:02d}-{n // 60 % 60:02d}-{n % 60:02d}:greeting {n}"
+                batch.append(line)
+                self.reference.append(line + "\n")
+            store.append(batch)
+            written += len(batch)
+
+    def expected_tail(self, limit, offset):
+        end = max(len(self.reference) - offset, 0)
+        return self.reference[max(end - limit, 0):end]
+
+    def assert_tails_match(self, store):
+        total = len(self.reference)
+        cases = [(limit, offset) for limit in (0, 1, 2, 7, 25, 60, total, total + 5)
+                 for offset in (0, 1, 6, 13, 40, total - 3, total, total + 2)]
+        for limit, offset in cases:
+            with self.subTest(limit=limit, offset=offset):
+                self.assertEqual(store.tail(limit, offset), self.expected_tail(limit, offset))
+
+    def segment_names(self):
+        return sorted(name for name in os.listdir(self.tmp) if name[len('greeting_log.txt.'):][:6].isdigit())
+
+    def test_tail_across_gzip_segments(self):
+        store, segments = self.open_store()
+        self.write(store, 400, random.Random(1))
+        # Segments may still be uncompressed here; reads must not depend on it
+        self.assert_tails_match(store)
+        segments.close()
+        names = self.segment_names()
+        self.assertGreater(len(names), 20)
+        self.assertTrue(all(name.endswith('.gz') for name in names))
+        self.assert_tails_match(store)
+        self.assertEqual(list(iter_log_lines(self.log_file)), self.reference)
+
+    def test_between_across_segments(self):
+        store, segments = self.open_store()
+        self.write(store, 300, random.Random(2))
+        segments.close()
+        stamps = [line[:19] for line in self.reference]
+        for since, until, limit in ((None, None, 1000), (stamps[10], stamps[250], 1000),
+                                    (stamps[37], stamps[37], 5), (stamps[100], None, 20),
+                                    (None, stamps[5], 1000), ("2030-01-01 00-00-00", None, 10)):
+            with self.subTest(since=since, until=until, limit=limit):
+                expected = [line for line, stamp in zip(self.reference, stamps)
+                            if (not since or stamp >= since) and (not until or stamp <= until)][:limit]
+                self.assertEqual(store.between(since, until, limit), expected)
+
+    def test_prune_keeps_newest_segments(self):
+        store, segments = self.open_store(keep=3)
+        self.write(store, 200, random.Random(3))
+        segments.close()
+        self.assertEqual(len(self.segment_names()), 3)
+        # Only what is still on disk can be read back
+        self.reference = list(iter_log_lines(self.log_file))
+        self.assertLess(len(self.reference), 200)
+        self.assertTrue(self.reference[-1].endswith(":greeting 199\n"))
+        self.assert_tails_match(store)
+
+    def test_index_shared_between_instances(self):
+        # A second process opening the same log sees the first one's rotations
+        first, first_segments = self.open_store()
+        self.write(first, 150, random.Random(4))
+        second, second_segments = self.open_store()
+        self.write(first, 150, random.Random(5))
+        first_segments.close()
+        self.assert_tails_match(second)
+        self.write(second, 50, random.Random(6))
+        second_segments.close()
+        self.assert_tails_match(first)
+
+    def test_reopen_rebuilds_index(self):
+        store, segments = self.open_store()
+        self.write(store, 200, random.Random(7))
+        segments.close()
+        os.remove(self.log_file + ".index")
+        reopened, reopened_segments = self.open_store()
+        reopened_segments.close()
+        self.assert_tails_match(reopened)
+
+    def test_missing_log(self):
+        store, segments = self.open_store()
+        with self.assertRaises(FileNotFoundError):
+            store.tail(10)
+        segments.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
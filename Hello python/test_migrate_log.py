@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from greeting_log import SqliteLogStore, TextLogStore
+from migrate_log import migrate
+
+# -------------------------------
+# Unit tests for the text to SQLite migration
+# -------------------------------
+# Run from this directory:  python -m unittest test_migrate_log
+
+
+class TestMigrate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, 'greeting_log.txt')
+        self.dst = os.path.join(self.tmp, 'greeting_log.db')
+        self.lines = [f"2024-01-01 00-00-{i:02d}:hello docker" for i in range(3)]
+        TextLogStore(self.src).append(self.lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def entries(self):
+        store = SqliteLogStore(self.dst)
+        try:
+            return [line.rstrip('\n') for line in store.tail(100)]
+        finally:
+            store.close()
+
+    def test_second_run_is_refused(self):
+        self.assertEqual(migrate(self.src, self.dst), 3)
+        with self.assertRaisesRegex(ValueError, "already has entries"):
+            migrate(self.src, self.dst)
+        self.assertEqual(self.entries(), self.lines)
+
+    def test_append(self):
+        store = SqliteLogStore(self.dst)
+        store.append(["2024-01-02 00-00-00:written by the app"])
+        store.close()
+        with self.assertRaises(ValueError):
+            migrate(self.src, self.dst)
+        self.assertEqual(migrate(self.src, self.dst, append=True), 3)
+        self.assertEqual(self.entries(), ["2024-01-02 00-00-00:written by the app"] + self.lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,22 +1,279 @@
 import unittest
+import codecs
+import io
+import mmap
 import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------------------
+# Parallel helpers (module level so worker processes can import them)
+# -------------------------------
+def split_ranges(filename, chunk_size):
+    """Split a file into (start, end) byte ranges of about chunk_size that end on a newline."""
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        ranges = []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                newline = mm.find(b'\n', min(start + chunk_size, size) - 1)
+                end = size if newline == -1 else newline + 1
+                ranges.append((start, end))
+                start = end
+    return ranges
+
+
+def _process_range(processor, filename, start, end, encoding):
+    # Ranges end on b'\n', which never occurs inside a multi-byte UTF-8 character
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunk = mm[start:end]
+    return processor.process_bytes(chunk, encoding)
+
+
+def _process_whole_file(processor, src, dst, chunk_size, encoding):
+    return processor.process_file(src, dst, chunk_size, encoding)
+
+# -------------------------------
+# Transform pipeline
+# -------------------------------
+ASCII_UPPER = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+# Encodings in which ASCII text is stored byte for byte
+ASCII_COMPATIBLE = {'ascii', 'utf-8', 'latin-1', 'iso8859-1', 'cp1252'}
+
+
+class MapStage:
+    """Pipeline stage that transforms every line.
+
+    bytes_func, if given, does the same job on raw bytes. It may be handed a
+    whole chunk of lines at once, so it must work line by line and leave
+    newlines alone. ascii_only marks a bytes_func that is only right for
+    ASCII input; other chunks take the str path.
+    """
+
+    def __init__(self, func, bytes_func=None, ascii_only=False):
+        self.func = func
+        self.bytes_func = bytes_func
+        self.ascii_only = ascii_only
+
+
+class FilterStage:
+    """Pipeline stage that keeps only the lines predicate accepts.
+
+    bytes_predicate, if given, makes the same decision for a raw line.
+    """
+
+    def __init__(self, predicate, bytes_predicate=None):
+        self.func = predicate
+        self.bytes_func = bytes_predicate
+        self.ascii_only = False
+
+
+def ascii_upper(data):
+    return data.translate(ASCII_UPPER)
+
+
+def upper_stage():
+    return MapStage(str.upper, ascii_upper, ascii_only=True)
+
+
+def _compose(first, second):
+    return lambda line: second(first(line))
+
+
+def _fuse(stages, attr):
+    """Collapse stages into (is_filter, function) steps, merging adjacent maps into one call."""
+    steps = []
+    for stage in stages:
+        func = getattr(stage, attr)
+        is_filter = isinstance(stage, FilterStage)
+        if not is_filter and steps and not steps[-1][0]:
+            steps[-1] = (False, _compose(steps[-1][1], func))
+        else:
+            steps.append((is_filter, func))
+    return steps
+
+
+def _run_lines(steps, lines):
+    """Push every line through all fused steps in a single pass."""
+    if not steps:
+        return list(lines)
+    if len(steps) == 1:
+        is_filter, func = steps[0]
+        return list(filter(func, lines) if is_filter else map(func, lines))
+    out = []
+    for line in lines:
+        for is_filter, func in steps:
+            if is_filter:
+                if not func(line):
+                    break
+            else:
+                line = func(line)
+        else:
+            out.append(line)
+    return out
+
+
+def _ascii_compatible(encoding):
+    return codecs.lookup(encoding).name in ASCII_COMPATIBLE
 
 # -------------------------------
 # File Processing System
 # -------------------------------
 class FileProcessor:
+    def __init__(self, stages=None):
+        # Uppercasing is the default pipeline
+        self.stages = [upper_stage()] if stages is None else list(stages)
+
+    def add_map(self, func, bytes_func=None, ascii_only=False):
+        """Append a map stage; returns self so calls can be chained."""
+        self.stages.append(MapStage(func, bytes_func, ascii_only))
+        return self
+
+    def add_filter(self, predicate, bytes_predicate=None):
+        """Append a filter stage; returns self so calls can be chained."""
+        self.stages.append(FilterStage(predicate, bytes_predicate))
+        return self
+
+    @property
+    def bytes_capable(self):
+        """True when every stage has a bytes version, so chunks need no decoding."""
+        return all(stage.bytes_func is not None for stage in self.stages)
+
     def read_file(self, filename):
         with open(filename, 'r') as f:
             return f.readlines()
 
     def process_data(self, data):
-        # Convert lines to uppercase
-        return [line.upper() for line in data]
+        # Run decoded lines through the pipeline (uppercase by default)
+        return _run_lines(_fuse(self.stages, 'func'), data)
+
+    def process_bytes(self, chunk, encoding='utf-8'):
+        """Run raw bytes holding whole lines through the pipeline and return bytes.
+
+        When every stage has a bytes version the chunk is never decoded: a
+        chunk is split into lines only as far as the last filter, and the maps
+        after it are applied to the whole chunk at once. Otherwise, or when an ASCII-only stage
+        meets non-ASCII data, the chunk goes through process_data.
+        """
+        if (self.bytes_capable and _ascii_compatible(encoding)
+                and (chunk.isascii() or not any(stage.ascii_only for stage in self.stages))):
+            # Only stages up to the last filter need the chunk split into lines
+            split = max((i + 1 for i, stage in enumerate(self.stages) if isinstance(stage, FilterStage)),
+                        default=0)
+            if split:
+                lines = _run_lines(_fuse(self.stages[:split], 'bytes_func'), chunk.splitlines(keepends=True))
+                chunk = b''.join(lines)
+            for stage in self.stages[split:]:
+                chunk = stage.bytes_func(chunk)
+            return chunk
+        lines = io.StringIO(chunk.decode(encoding), newline='').readlines()
+        return ''.join(self.process_data(lines)).encode(encoding)
 
     def write_file(self, filename, data):
         with open(filename, 'w') as f:
             f.writelines(data)
 
+    def read_chunks(self, filename, chunk_size=1024 * 1024, encoding='utf-8'):
+        """Yield the file as lists of whole lines, about chunk_size characters each.
+
+        The text layer decodes incrementally, so multi-byte characters split
+        across two reads are put back together before a line is yielded.
+        """
+        with open(filename, 'r', encoding=encoding, newline='') as f:
+            yield from iter(lambda: f.readlines(chunk_size), [])
+
+    def read_byte_chunks(self, filename, chunk_size=1024 * 1024):
+        """Yield the file as bytes of about chunk_size that end on a newline (except the last)."""
+        with open(filename, 'rb') as f:
+            rest = b''
+            for block in iter(lambda: f.read(chunk_size), b''):
+                block = rest + block
+                cut = block.rfind(b'\n') + 1
+                rest = block[cut:]
+                if cut:
+                    yield block[:cut]
+            if rest:
+                yield rest
+
+    def process_file(self, src, dst, chunk_size=1024 * 1024, encoding='utf-8', fast=True):
+        """Stream src through the pipeline into dst without loading the whole file.
+
+        If the pipeline can work on bytes (and fast is set) chunks are read
+        and written raw; otherwise lines are decoded and run through
+        process_data. Returns the number of lines written.
+        """
+        if fast and self.bytes_capable and _ascii_compatible(encoding):
+            count, processed = 0, b''
+            with open(dst, 'wb') as f:
+                for chunk in self.read_byte_chunks(src, chunk_size):
+                    processed = self.process_bytes(chunk, encoding)
+                    f.write(processed)
+                    count += processed.count(b'\n')
+                if processed and not processed.endswith(b'\n'):
+                    count += 1
+            return count
+
+        count = 0
+        with open(dst, 'w', encoding=encoding, newline='') as f:
+            for lines in self.read_chunks(src, chunk_size, encoding):
+                processed = self.process_data(lines)
+                f.writelines(processed)
+                count += len(processed)
+        return count
+
+    def process_file_parallel(self, src, dst, workers=None, chunk_size=16 * 1024 * 1024, encoding='utf-8'):
+        """Like process_file, but line-aligned byte ranges are processed on several cores.
+
+        Output keeps the input order. At most two ranges per worker are in
+        flight, so memory stays bounded however large the file is. Ranges are
+        split on newline bytes, which needs an ASCII-compatible encoding
+        (UTF-8, Latin-1, ...); any other encoding falls back to process_file.
+        Stages are sent to the worker processes, so their functions must be
+        picklable (no lambdas). Returns the number of lines written.
+        """
+        if not _ascii_compatible(encoding):
+            return self.process_file(src, dst, encoding=encoding)
+        workers = workers or os.cpu_count() or 1
+        count, last = 0, b''
+        with ProcessPoolExecutor(workers) as executor, open(dst, 'wb') as f:
+            pending = deque()
+
+            def write_next():
+                nonlocal count, last
+                processed = pending.popleft().result()
+                f.write(processed)
+                count += processed.count(b'\n')
+                last = processed or last
+
+            for start, end in split_ranges(src, chunk_size):
+                if len(pending) >= 2 * workers:
+                    write_next()
+                pending.append(executor.submit(_process_range, self, src, start, end, encoding))
+            while pending:
+                write_next()
+        if last and not last.endswith(b'\n'):
+            count += 1
+        return count
+
+    def process_directory(self, src_dir, dst_dir, workers=None, chunk_size=1024 * 1024, encoding='utf-8'):
+        """Process every file in src_dir into dst_dir concurrently.
+
+        Returns {filename: lines written}.
+        """
+        os.makedirs(dst_dir, exist_ok=True)
+        names = sorted(name for name in os.listdir(src_dir) if os.path.isfile(os.path.join(src_dir, name)))
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {name: executor.submit(_process_whole_file, self, os.path.join(src_dir, name),
+                                             os.path.join(dst_dir, name), chunk_size, encoding)
+                       for name in names}
+            return {name: future.result() for name, future in futures.items()}
+
 # -------------------------------
 # Unit Tests
 # -------------------------------
@@ -55,6 +312,81 @@ class TestFileProcessor(unittest.TestCase):
             result = f.readlines()
         self.assertEqual(result, ["HELLO\n", "WORLD\n"])
 
+    def test_process_file_streaming(self):
+        # Multi-byte characters with a chunk size that splits them between reads
+        text = "héllo wörld\nstraße ünïcode ✓\n" * 50 + "no newline at end"
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        count = self.processor.process_file(self.input_file, self.output_file, chunk_size=7)
+        self.assertEqual(count, 101)
+        with open(self.output_file, encoding='utf-8') as f:
+            self.assertEqual(f.read(), text.upper())
+
+        chunks = list(self.processor.read_chunks(self.input_file, chunk_size=64))
+        self.assertGreater(len(chunks), 1)
+
+    def test_process_file_parallel_keeps_order(self):
+        text = "".join(f"line {i} ünïcode\r\n" if i % 3 else f"line {i}\n" for i in range(500))
+        with open(self.input_file, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        self.assertGreater(len(split_ranges(self.input_file, 100)), 10)
+
+        count = self.processor.process_file_parallel(self.input_file, self.output_file, workers=2, chunk_size=100)
+        self.assertEqual(count, 500)
+        with open(self.output_file, encoding='utf-8', newline='') as f:
+            self.assertEqual(f.read(), text.upper())
+
+    def test_process_file_parallel_other_encodings(self):
+        # UTF-16 cannot be split on newline bytes, so it is processed in one stream
+        text = "line ünïcode\n" * 100 + "last"
+        with open(self.input_file, 'w', encoding='utf-16-le') as f:
+            f.write(text)
+        count = self.processor.process_file_parallel(self.input_file, self.output_file, workers=2,
+                                                     chunk_size=64, encoding='utf-16-le')
+        self.assertEqual(count, 101)
+        with open(self.output_file, encoding='utf-16-le') as f:
+            self.assertEqual(f.read(), text.upper())
+
+    def test_pipeline_stages(self):
+        processor = FileProcessor().add_filter(lambda line: not line.startswith('#'),
+                                               lambda line: not line.startswith(b'#'))
+        processor.add_map(lambda line: line.replace('O', '0'), lambda line: line.replace(b'O', b'0'))
+        self.assertTrue(processor.bytes_capable)
+        self.assertEqual(processor.process_data(["# skip\n", "foo\n"]), ["F00\n"])
+        self.assertEqual(processor.process_bytes(b"# skip\nfoo\n"), b"F00\n")
+
+        # A str-only stage sends every chunk through the decoding path
+        processor.add_map(str.strip)
+        self.assertFalse(processor.bytes_capable)
+        self.assertEqual(processor.process_bytes(b"# skip\nfoo\n"), b"F00")
+
+        self.assertEqual(FileProcessor(stages=[]).process_data(["as is\n"]), ["as is\n"])
+
+    def test_bytes_path_matches_str_path(self):
+        text = "plain ascii line\n" * 200 + "ünïcode ß line\n" * 3 + "tail"
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        for fast in (True, False):
+            count = self.processor.process_file(self.input_file, self.output_file, chunk_size=64, fast=fast)
+            self.assertEqual(count, 204)
+            with open(self.output_file, encoding='utf-8') as f:
+                self.assertEqual(f.read(), text.upper())
+
+    def test_process_directory(self):
+        src_dir = tempfile.mkdtemp()
+        dst_dir = os.path.join(src_dir, "out")
+        try:
+            for i in range(3):
+                with open(os.path.join(src_dir, f"file{i}.txt"), 'w') as f:
+                    f.write("abc\n" * (i + 1))
+            counts = self.processor.process_directory(src_dir, dst_dir, workers=2)
+            self.assertEqual(counts, {"file0.txt": 1, "file1.txt": 2, "file2.txt": 3})
+            with open(os.path.join(dst_dir, "file2.txt")) as f:
+                self.assertEqual(f.read(), "ABC\n" * 3)
+        finally:
+            shutil.rmtree(src_dir)
+
 # -------------------------------
 # Run Unit Tests
 # -------------------------------
@@ -1,10 +1,413 @@
 import unittest
+import asyncio
+import codecs
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import reduce
+from operator import itemgetter
+
+# -------------------------------
+# Transports
+# -------------------------------
+class InMemoryConnection:
+    """A connection to an InMemoryTransport; answers requests from its api_data."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.requests = 0
+        self.closed = False
+
+    async def request(self, endpoint):
+        if self.transport.latency:
+            await asyncio.sleep(self.transport.latency)
+        self.requests += 1
+        data = self.transport.api_data
+        if endpoint == "error" or data.get(endpoint) is None:
+            raise ValueError("API returned error")
+        return data[endpoint]
+
+    def close(self):
+        self.closed = True
+
+
+class InMemoryTransport:
+    """Local stand-in for the API server, serving a dict of endpoint -> data.
+
+    latency is added to every request and connect_latency to every new
+    connection (the handshake a real keep-alive pool saves). Any object with
+    an async connect() returning connections with async request(endpoint)
+    and close() can be used in its place.
+    """
+
+    def __init__(self, api_data, latency=0.0, connect_latency=0.0):
+        self.api_data = api_data
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.connects = 0
+
+    async def connect(self):
+        if self.connect_latency:
+            await asyncio.sleep(self.connect_latency)
+        self.connects += 1
+        return InMemoryConnection(self)
+
+# -------------------------------
+# Connection Pool
+# -------------------------------
+class ConnectionPool:
+    """Keeps idle transport connections alive for reuse.
+
+    Up to max_idle connections are kept, each for at most keepalive seconds
+    after its last use. The pool holds no asyncio primitives, so one client
+    can be used from successive asyncio.run() calls.
+    """
+
+    def __init__(self, transport, max_idle=10, keepalive=30.0):
+        self.transport = transport
+        self.max_idle = max_idle
+        self.keepalive = keepalive
+        self._idle = deque()  # (connection, last used)
+
+    async def acquire(self):
+        now = time.monotonic()
+        while self._idle:
+            conn, last_used = self._idle.pop()
+            if now - last_used <= self.keepalive:
+                return conn
+            conn.close()
+        return await self.transport.connect()
+
+    def release(self, conn):
+        if len(self._idle) < self.max_idle:
+            self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+
+    def discard(self, conn):
+        # A connection that failed mid-request is not trusted again
+        conn.close()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop()[0].close()
+
+# -------------------------------
+# Response Cache
+# -------------------------------
+class _Flight:
+    """One upstream load that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """Bounded LRU cache of responses by endpoint, each kept for ttl seconds.
+
+    Concurrent misses for the same key are coalesced into one upstream load
+    (single flight), for threads via get_or_load and for coroutines via
+    aget_or_load. With stale_while_revalidate an expired entry is still
+    served while one background load refreshes it.
+    """
+
+    def __init__(self, maxsize=128, ttl=60.0, stale_while_revalidate=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._flights = {}  # key -> _Flight
+        self._async_flights = {}  # key -> asyncio.Future
+        self._refreshes = set()  # keeps running load tasks alive
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, flights):
+        """Under the lock: return ("hit"|"stale", value), ("wait", flight) or ("load", None)."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "hit", entry[0]
+            if self.stale_while_revalidate:
+                self.stale_hits += 1
+                return "stale", entry[0]
+        if key in flights:
+            self.coalesced += 1
+            return "wait", flights[key]
+        self.misses += 1
+        return "load", None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() at most once at a time to fill it."""
+        with self._lock:
+            state, value = self._lookup(key, self._flights)
+            if state == "stale" and key not in self._flights:
+                flight = self._flights[key] = _Flight()
+                threading.Thread(target=self._load, args=(key, loader, flight), daemon=True).start()
+            elif state == "load":
+                flight = self._flights[key] = _Flight()
+        if state in ("hit", "stale"):
+            return value
+        if state == "wait":
+            flight = value
+            flight.done.wait()
+        else:
+            self._load(key, loader, flight)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key, loader, flight):
+        try:
+            flight.value = loader()
+            self.put(key, flight.value)
+        except Exception as e:
+            # Errors reach every waiting caller but are never cached
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def aget_or_load(self, key, loader):
+        """Coroutine version of get_or_load; loader() returns an awaitable."""
+        with self._lock:
+            state, value = self._lookup(key, self._async_flights)
+            future = None
+            if state == "load" or (state == "stale" and key not in self._async_flights):
+                future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        if state == "hit":
+            return value
+        if future is not None:
+            # The load runs in its own task, so cancelling the caller that
+            # started it does not fail the others waiting on it
+            task = asyncio.ensure_future(self._aload(key, loader, future))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        if state == "stale":
+            return value
+        if state == "wait":
+            future = value
+        # shield: a cancelled caller must not cancel the shared load
+        return await asyncio.shield(future)
+
+    async def _aload(self, key, loader, future):
+        try:
+            value = await loader()
+            self.put(key, value)
+            future.set_result(value)
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it once so a failed refresh nobody waits on is not logged
+            future.exception()
+        finally:
+            with self._lock:
+                del self._async_flights[key]
+            if not future.done():
+                future.cancel()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                    "coalesced": self.coalesced, "evictions": self.evictions, "size": len(self._entries),
+                    "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0}
+
+# -------------------------------
+# Streaming record sources
+# -------------------------------
+def iter_ndjson(lines):
+    """Yield one record per non-blank line of an NDJSON stream (str or bytes lines)."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+_WHITESPACE = re.compile(r'\s*')
+# The rest of a number cut after its integer part ("12|.5", "1|e5", "1.5|E-2")
+_NUMBER_TAIL = re.compile(r'(\.\d*)?([eE][+-]?\d*)?')
+_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+
+def _number_continues(buf, pos):
+    """True if buf[pos:] may be the cut-off fraction or exponent of the number before pos."""
+    return pos > 0 and buf[pos - 1] in '0123456789' and _NUMBER_TAIL.fullmatch(buf, pos) is not None
+
+
+def _needs_more(error, buf):
+    """True if the JSONDecodeError raised on buf can still be cured by more input."""
+    if _number_continues(buf, error.pos):
+        return True
+    rest = buf[error.pos:]
+    if _WHITESPACE.match(rest).end() == len(rest) or error.msg.startswith('Unterminated string'):
+        return True
+    if error.msg.startswith('Invalid \\uXXXX escape'):
+        return len(rest) <= len('uXXXX')
+    if error.msg == 'Expecting value':
+        return any(literal.startswith(rest) for literal in _LITERALS)
+    return False
+
+
+def iter_json_array(chunks):
+    """Yield the items of a JSON array that arrives as a sequence of str or bytes chunks.
+
+    Only one item (plus the unread part of the current chunk) is held at a
+    time. Invalid JSON raises ValueError as soon as it arrives.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf, pos = '', 0
+    # What comes next: "[", the first item or "]", an item, or "," / "]"
+    expect = 'array'
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        buf, pos = buf[pos:] + chunk, 0
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            char = buf[pos]
+            if expect == 'array':
+                if char != '[':
+                    raise ValueError("expected a JSON array")
+                expect, pos = 'first', pos + 1
+                continue
+            if expect == 'separator' or (expect == 'first' and char == ']'):
+                if char == ']':
+                    return
+                if char != ',':
+                    raise ValueError(f"expected ',' or ']' in JSON array, got {char!r}")
+                expect, pos = 'item', pos + 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if not _needs_more(e, buf):
+                    raise
+                break  # the item continues in the next chunk
+            if not isinstance(item, (dict, list)):
+                # A scalar is only complete once the "," or "]" after it has
+                # arrived: "12." and "1e" decode as 12 and 1 with more to come
+                after = _WHITESPACE.match(buf, end).end()
+                if after == len(buf):
+                    break
+                if buf[after] not in ',]':
+                    if _number_continues(buf, end):
+                        break
+                    raise ValueError(f"expected ',' or ']' in JSON array, got {buf[after]!r}")
+            yield item
+            expect, pos = 'separator', end
+    raise ValueError("JSON array is truncated")
+
+# -------------------------------
+# Record field extraction
+# -------------------------------
+_MISSING = object()
+
+
+def _path(field):
+    """Split a dotted field into keys; all-digit parts index into lists ("tags.0")."""
+    if not isinstance(field, str):
+        return tuple(field)
+    return tuple(int(key) if key.isdigit() else key for key in field.split('.'))
+
+
+def _path_getter(path):
+    getters = [itemgetter(key) for key in path]
+    if len(getters) == 1:
+        return getters[0]
+    return lambda record: reduce(lambda value, getter: getter(value), getters, record)
+
+
+class RecordSpec:
+    """Which fields to pull out of each record, compiled once into itemgetters.
+
+    fields is one field (records yield a value) or a list of fields (records
+    yield a tuple). A field is a key, a dotted path into nested objects
+    ("address.city") or a tuple of keys. defaults maps a field to the value
+    used when a record lacks it; records missing a field without a default
+    are skipped.
+    """
+
+    def __init__(self, fields, defaults=None):
+        self.single = isinstance(fields, str)
+        self.fields = [fields] if self.single else list(fields)
+        defaults = defaults or {}
+        self._paths = [_path(field) for field in self.fields]
+        self._defaults = [defaults.get(field, _MISSING) for field in self.fields]
+        if all(len(path) == 1 for path in self._paths):
+            # itemgetter returns a value for one key and a tuple for several
+            self._get = itemgetter(*(path[0] for path in self._paths))
+        else:
+            getters = [_path_getter(path) for path in self._paths]
+            if self.single:
+                self._get = getters[0]
+            else:
+                self._get = lambda record: tuple([getter(record) for getter in getters])
+        self._getters = [_path_getter(path) for path in self._paths]
+
+    def _get_with_defaults(self, record):
+        values = []
+        for getter, default in zip(self._getters, self._defaults):
+            try:
+                values.append(getter(record))
+            except (LookupError, TypeError):
+                if default is _MISSING:
+                    return _MISSING
+                values.append(default)
+        return values[0] if self.single else tuple(values)
+
+    def extract(self, records):
+        """Yield the fields of every record, consuming records lazily."""
+        get = self._get
+        for record in records:
+            try:
+                value = get(record)
+            except (LookupError, TypeError):
+                # Rare path: some field is missing
+                value = self._get_with_defaults(record)
+                if value is _MISSING:
+                    continue
+            yield value
+
+
+NAME_SPEC = RecordSpec("name")
 
 # -------------------------------
 # Simulated API Client
 # -------------------------------
 class APIClient:
-    def __init__(self):
+    def __init__(self, transport=None, retries=3, backoff=0.05, pool_size=10,
+                 cache_size=0, cache_ttl=60.0, stale_while_revalidate=False):
         # Simulated "API data"
         self.api_data = {
             "users": [
@@ -14,16 +417,81 @@ class APIClient:
             ],
             "error": None  # Can be set to simulate API error
         }
+        # By default the async API is served from api_data itself
+        self.transport = transport or InMemoryTransport(self.api_data)
+        self.pool = ConnectionPool(self.transport, max_idle=pool_size)
+        self.retries = retries
+        self.backoff = backoff
+        # Optional response cache in front of fetch_data and fetch
+        self.cache = ResponseCache(cache_size, cache_ttl, stale_while_revalidate) if cache_size else None
 
     def fetch_data(self, endpoint):
         """Simulate fetching data from API"""
+        if self.cache is not None:
+            return self.cache.get_or_load(endpoint, lambda: self._fetch_source(endpoint))
+        return self._fetch_source(endpoint)
+
+    def _fetch_source(self, endpoint):
         if endpoint == "error" or self.api_data.get(endpoint) is None:
             raise ValueError("API returned error")
         return self.api_data[endpoint]
 
-    def process_data(self, data):
-        """Extract 'name' field from the data"""
-        return [item['name'] for item in data if 'name' in item]
+    def process_data(self, data, spec=NAME_SPEC):
+        """Extract 'name' field from the data (or the fields of another RecordSpec)"""
+        return list(spec.extract(data))
+
+    def iter_process_data(self, records, spec=NAME_SPEC):
+        """Streaming process_data: records can be any iterable, e.g. iter_ndjson(f)."""
+        return spec.extract(records)
+
+    async def fetch(self, endpoint):
+        """Fetch one endpoint through the transport, on a pooled connection.
+
+        A ValueError is retried up to `retries` times, waiting backoff,
+        2 * backoff, 4 * backoff, ... seconds in between; the last one is raised.
+        """
+        if self.cache is not None:
+            return await self.cache.aget_or_load(endpoint, lambda: self._fetch_transport(endpoint))
+        return await self._fetch_transport(endpoint)
+
+    async def _fetch_transport(self, endpoint):
+        for attempt in range(self.retries + 1):
+            conn = await self.pool.acquire()
+            try:
+                data = await conn.request(endpoint)
+            except ValueError:
+                self.pool.release(conn)
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            except BaseException:
+                self.pool.discard(conn)
+                raise
+            else:
+                self.pool.release(conn)
+                return data
+
+    async def fetch_many(self, endpoints, concurrency=10, return_exceptions=False):
+        """Fetch many endpoints with at most `concurrency` requests in flight.
+
+        Results come back in the order of endpoints. With return_exceptions a
+        failed endpoint yields its exception instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(endpoint):
+            async with semaphore:
+                return await self.fetch(endpoint)
+
+        return await asyncio.gather(*(bounded(endpoint) for endpoint in endpoints),
+                                    return_exceptions=return_exceptions)
+
+    def cache_stats(self):
+        """Hit/miss/coalesced counters of the response cache, or None without one."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def close(self):
+        self.pool.close()
 
 # -------------------------------
 # Unit Tests
@@ -55,6 +523,228 @@ class TestAPIClient(unittest.TestCase):
         processed = self.client.process_data(data)
         self.assertEqual(processed, ["Alice", "Bob"])
 
+class FlakyTransport(InMemoryTransport):
+    """Fails the first `failures` requests, then behaves normally."""
+
+    def __init__(self, api_data, failures):
+        super().__init__(api_data)
+        self.failures = failures
+
+    async def connect(self):
+        conn = await super().connect()
+        request = conn.request
+
+        async def flaky(endpoint):
+            if self.failures:
+                self.failures -= 1
+                raise ValueError("API returned error")
+            return await request(endpoint)
+
+        conn.request = flaky
+        return conn
+
+
+class TestAsyncAPIClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = APIClient(backoff=0)
+
+    def test_fetch_many_keeps_order(self):
+        results = asyncio.run(self.client.fetch_many(["users", "error", "users"], concurrency=2,
+                                                     return_exceptions=True))
+        self.assertEqual(results[0], self.client.api_data["users"])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], results[0])
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.client.fetch_many(["users", "error"]))
+
+    def test_retry_with_backoff(self):
+        transport = FlakyTransport(self.client.api_data, failures=2)
+        client = APIClient(transport, backoff=0)
+        self.assertEqual(asyncio.run(client.fetch("users")), self.client.api_data["users"])
+        self.assertEqual(transport.failures, 0)
+
+        transport.failures = client.retries + 1
+        with self.assertRaises(ValueError):
+            asyncio.run(client.fetch("users"))
+
+    def test_connections_are_reused(self):
+        transport = InMemoryTransport(self.client.api_data, latency=0.001)
+        client = APIClient(transport, pool_size=5)
+        asyncio.run(client.fetch_many(["users"] * 100, concurrency=5))
+        self.assertEqual(transport.connects, 5)
+        # The pool outlives the event loop that filled it
+        asyncio.run(client.fetch_many(["users"] * 10, concurrency=5))
+        self.assertEqual(transport.connects, 5)
+        client.close()
+        self.assertEqual(len(client.pool._idle), 0)
+
+class TestCachedAPIClient(unittest.TestCase):
+
+    def test_ttl_and_lru(self):
+        client = APIClient(cache_size=2, cache_ttl=0.05)
+        client.api_data["posts"] = ["p"]
+        client.api_data["tags"] = ["t"]
+        self.assertEqual(client.fetch_data("users"), client.api_data["users"])
+        client.api_data["users"] = ["changed"]
+        self.assertNotEqual(client.fetch_data("users"), ["changed"])
+        client.fetch_data("posts")
+        client.fetch_data("tags")  # evicts "users"
+        stats = client.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 3, 1))
+        self.assertEqual(client.fetch_data("users"), ["changed"])
+
+        time.sleep(0.06)
+        client.api_data["tags"] = ["new"]
+        self.assertEqual(client.fetch_data("tags"), ["new"])
+
+    def test_errors_are_not_cached(self):
+        client = APIClient(cache_size=10)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                client.fetch_data("error")
+        self.assertEqual(client.cache_stats()["misses"], 2)
+
+    def test_concurrent_threads_share_one_load(self):
+        cache = ResponseCache()
+        loads = []
+        release = threading.Event()
+
+        def loader():
+            loads.append(1)
+            release.wait()
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("users", loader)))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        while cache.stats()["coalesced"] < 19:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(results, ["value"] * 20)
+        self.assertEqual(cache.stats()["hit_rate"], 0.0)
+
+    def test_concurrent_coroutines_share_one_load(self):
+        transport = InMemoryTransport(APIClient().api_data, latency=0.01)
+        client = APIClient(transport, cache_size=10)
+        results = asyncio.run(client.fetch_many(["users"] * 50, concurrency=50))
+        self.assertEqual(len(results), 50)
+        self.assertEqual(transport.connects, 1)
+        self.assertEqual(client.cache_stats()["coalesced"], 49)
+
+    def test_stale_while_revalidate(self):
+        cache = ResponseCache(ttl=0.01, stale_while_revalidate=True)
+        cache.put("users", "old")
+        time.sleep(0.02)
+        self.assertEqual(cache.get_or_load("users", lambda: "new"), "old")
+        deadline = time.time() + 1
+        while cache._entries["users"][0] != "new" and time.time() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(cache.get_or_load("users", lambda: "newer"), "new")
+        self.assertEqual(cache.stats()["stale_hits"], 1)
+
+        async def load():
+            return "async"
+
+        async def stale_then_fresh():
+            await asyncio.sleep(0.02)
+            first = await cache.aget_or_load("users", load)
+            await asyncio.sleep(0)
+            return first, await cache.aget_or_load("users", load)
+
+        self.assertEqual(asyncio.run(stale_then_fresh()), ("new", "async"))
+
+    def test_cancelled_first_caller_does_not_fail_the_others(self):
+        cache = ResponseCache()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def main():
+            leader = asyncio.create_task(cache.aget_or_load("users", load))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(cache.aget_or_load("users", load))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), "value")
+        self.assertEqual(cache.get_or_load("users", lambda: "reloaded"), "value")
+
+class TestStreamingProcessData(unittest.TestCase):
+
+    RECORDS = [
+        {"name": "Alice", "age": 25, "address": {"city": "Paris"}, "tags": ["a", "b"]},
+        {"name": "Bob", "address": {}},
+        {"age": 40},
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_specs(self):
+        records = self.RECORDS
+        self.assertEqual(self.client.process_data(records), ["Alice", "Bob"])
+        spec = RecordSpec(["name", "age"], defaults={"age": 0})
+        self.assertEqual(self.client.process_data(records, spec), [("Alice", 25), ("Bob", 0)])
+        spec = RecordSpec(["name", "address.city", "tags.0"], defaults={"address.city": "?", "tags.0": None})
+        self.assertEqual(self.client.process_data(records, spec), [("Alice", "Paris", "a"), ("Bob", "?", None)])
+        self.assertEqual(self.client.process_data(records, RecordSpec("address.city")), ["Paris"])
+
+    def test_ndjson_stream(self):
+        stream = io.StringIO("".join(json.dumps(record) + "\n" for record in self.RECORDS) + "\n")
+        names = self.client.iter_process_data(iter_ndjson(stream))
+        self.assertEqual(next(names), "Alice")
+        self.assertEqual(list(names), ["Bob"])
+
+    def test_chunked_json_array(self):
+        payload = json.dumps([1234, "x", *self.RECORDS, {"name": "✓"}]).encode()
+        for size in (1, 3, 7, 64, len(payload)):
+            chunks = (payload[i:i + size] for i in range(0, len(payload), size))
+            items = list(iter_json_array(chunks))
+            self.assertEqual(items[:2], [1234, "x"])
+            self.assertEqual(self.client.process_data(items[2:]), ["Alice", "Bob", "✓"])
+
+        # Numbers split inside the fraction or the exponent
+        self.assertEqual(list(iter_json_array(['[12.', '5]'])), [12.5])
+        self.assertEqual(list(iter_json_array(['[1e', '5]'])), [1e5])
+        self.assertEqual(list(iter_json_array(['[-', '1.5E', '-2 ', ', 7', ']'])), [-1.5e-2, 7])
+
+        mixed = json.dumps([0.25, -3e-7, 12345, True, None, "s", [1.5, 2], {"n": 6.02e23}] * 20)
+        rng = random.Random(7)
+        for _ in range(100):
+            cuts = sorted(rng.sample(range(1, len(mixed)), 40))
+            chunks = [mixed[i:j] for i, j in zip([0] + cuts, cuts + [len(mixed)])]
+            self.assertEqual(list(iter_json_array(chunks)), json.loads(mixed))
+
+        self.assertEqual(list(iter_json_array(["  [ ]  "])), [])
+        self.assertEqual(list(iter_json_array(['[', '"a\\u00', 'e9"', ', tr', 'ue, n', 'ull]'])), ["a\u00e9", True, None])
+        # Exactly one comma between items, none before the first or after the last
+        for bad in ('[1,,2]', '[1,2,]', '[,1]', '[,]', '[{"a": 1} {"b": 2}]', '[1 2]', '["a" "b"]', '[1.x]'):
+            with self.assertRaises(ValueError, msg=bad):
+                list(iter_json_array([bad]))
+        # A bad item fails straight away instead of buffering the rest of the stream
+        def bad_then_endless():
+            yield '[{"a": 1}, {"a": x}, '
+            while True:
+                yield '{"a": 1}, '
+
+        with self.assertRaisesRegex(ValueError, "Expecting value"):
+            list(iter_json_array(bad_then_endless()))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[{"name": 1}']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"name": 1}']))
+
 # -------------------------------
 # Run Unit Tests
 # -------------------------------
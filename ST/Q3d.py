@@ -1,45 +1,359 @@
 import unittest
+import os
+import shutil
 import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 
 # -------------------------------
-# In-Memory Database CRUD System
+# Connection Pool
+# -------------------------------
+class _Reader:
+    """Holds one thread's read connection in the pool's thread-local storage.
+
+    It is dropped when its thread exits, and a finalizer then closes the connection.
+    """
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release_reader(readers, lock, conn):
+    # Must not refer to the pool, or the finalizer would keep it alive
+    with lock:
+        readers.discard(conn)
+    conn.close()
+
+
+class ConnectionPool:
+    """One SQLite connection per reading thread, plus a single shared writer connection.
+
+    File databases run in WAL mode, so readers never wait for the writer. An
+    in-memory database only exists on one connection, so there everything goes
+    through the writer connection under `write_lock`. A reader's connection
+    is closed when its thread exits, so thread-per-request servers do not
+    pile up connections.
+    """
+
+    def __init__(self, path=":memory:", mmap_size=256 * 1024 * 1024, cache_size_kb=64 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = set()
+        self._readers_lock = threading.Lock()
+        self.writer = self._connect()
+        if not self.in_memory:
+            self.writer.execute('PRAGMA journal_mode=WAL')
+
+    @property
+    def in_memory(self):
+        return self.path == ":memory:"
+
+    def reader(self):
+        """Return the calling thread's read connection, opening it on first use."""
+        if self.in_memory:
+            return self.writer
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            conn = self._connect()
+            reader = self._local.reader = _Reader(conn)
+            with self._readers_lock:
+                self._readers.add(conn)
+            weakref.finalize(reader, _release_reader, self._readers, self._readers_lock, conn)
+        return reader.conn
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self.writer.close()
+
+    def _connect(self):
+        # The writer is shared under write_lock, and close() closes readers from another thread
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        if not self.in_memory:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            # Negative cache_size is in KiB rather than pages
+            conn.execute(f'PRAGMA cache_size={-int(self.cache_size_kb)}')
+        return conn
+
+# -------------------------------
+# Read-through User Cache
+# -------------------------------
+class UserCache:
+    """Bounded LRU cache of user rows by id, with an optional time-to-live."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped on every invalidation so a read that raced with a write is not cached
+        self.generation = 0
+        self._entries = OrderedDict()  # user_id -> (row, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return the cached row or None, counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, row, generation):
+        """Cache `row` unless the cache was invalidated since `generation` was read."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[user_id] = (row, expires_at)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "size": len(self._entries)}
+
+# -------------------------------
+# Database CRUD System (in-memory or file-backed)
 # -------------------------------
 class DatabaseCRUD:
-    def __init__(self):
-        # Use in-memory SQLite database
-        self.conn = sqlite3.connect(":memory:")
+    # SQLite's default limit on "?" parameters in one statement
+    MAX_PARAMS = 999
+
+    def __init__(self, path=":memory:", autocommit=True, cache_size=0, cache_ttl=None):
+        # Use in-memory SQLite database unless a file path is given
+        self.pool = ConnectionPool(path)
+        # Optional read-through cache in front of read_user/read_users
+        self.cache = UserCache(cache_size, cache_ttl) if cache_size else None
+        self.conn = self.pool.writer
         self.cursor = self.conn.cursor()
+        # With autocommit=False writes stay pending until commit() is called
+        self.autocommit = autocommit
+        self._in_transaction = False
         self.create_table()
 
     def create_table(self):
-        self.cursor.execute('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                age INTEGER
-            )
-        ''')
-        self.conn.commit()
+        with self.pool.write_lock:
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    age INTEGER
+                )
+            ''')
+            self.conn.commit()
 
     def create_user(self, name, age):
-        self.cursor.execute('INSERT INTO users (name, age) VALUES (?, ?)', (name, age))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self.pool.write_lock:
+            self.cursor.execute('INSERT INTO users (name, age) VALUES (?, ?)', (name, age))
+            self._commit()
+            return self.cursor.lastrowid
 
     def read_user(self, user_id):
-        self.cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        return self.cursor.fetchone()
+        if self.cache is None:
+            return self._read(lambda conn: conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone())
+        row = self.cache.get(user_id)
+        if row is None:
+            generation = self.cache.generation
+            row = self._read(lambda conn: conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone())
+            if row is not None:
+                self.cache.put(user_id, row, generation)
+        return row
+
+    def read_users(self, user_ids):
+        """Return {user_id: row} for the ids that exist, querying only the cache misses."""
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            row = self.cache.get(user_id) if self.cache is not None else None
+            if row is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = row
+        generation = self.cache.generation if self.cache is not None else None
+        for i in range(0, len(missing), self.MAX_PARAMS):
+            chunk = missing[i:i + self.MAX_PARAMS]
+            sql = f"SELECT * FROM users WHERE id IN ({', '.join('?' * len(chunk))})"
+            for row in self._read(lambda conn: conn.execute(sql, chunk).fetchall()):
+                found[row[0]] = row
+                if self.cache is not None:
+                    self.cache.put(row[0], row, generation)
+        return found
+
+    # Streaming scans and secondary indexes
+
+    INDEXED_COLUMNS = ("name", "age")
+
+    def iter_users(self, where=None, params=(), batch_size=1000, order_by=("id",)):
+        """Yield users matching the SQL condition `where`, `batch_size` rows at a time.
+
+        Pages are fetched by keyset pagination on `order_by` (which must end with
+        the unique id), so each page is an index seek rather than an OFFSET
+        scan and only one page is ever held in memory.
+        """
+        columns = ", ".join(order_by)
+        positions = [("id", "name", "age").index(column) for column in order_by]
+        condition = f"({where})" if where else "1"
+        last_key = None
+        while True:
+            if last_key is None:
+                sql = f"SELECT * FROM users WHERE {condition} ORDER BY {columns} LIMIT ?"
+                args = (*params, batch_size)
+            else:
+                marks = ", ".join("?" * len(order_by))
+                sql = f"SELECT * FROM users WHERE {condition} AND ({columns}) > ({marks}) ORDER BY {columns} LIMIT ?"
+                args = (*params, *last_key, batch_size)
+            rows = self._read(lambda conn: conn.execute(sql, args).fetchmany(batch_size))
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_key = tuple(rows[-1][i] for i in positions)
+
+    def find_by_name(self, name, batch_size=1000):
+        self.ensure_index("name")
+        return self.iter_users("name = ?", (name,), batch_size)
+
+    def find_by_age_range(self, min_age, max_age, batch_size=1000):
+        """Yield users with min_age <= age <= max_age, ordered by age."""
+        self.ensure_index("age")
+        return self.iter_users("age BETWEEN ? AND ?", (min_age, max_age), batch_size, order_by=("age", "id"))
+
+    def ensure_index(self, column):
+        """Create the secondary index on `column` the first time it is needed."""
+        if column not in self.INDEXED_COLUMNS:
+            raise ValueError(f"No secondary index for column: {column}")
+        with self.pool.write_lock:
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_users_{column} ON users ({column})')
+            self._commit()
+
+    def explain(self, sql, params=()):
+        """Return SQLite's query plan for `sql`, one line per step."""
+        plan = self._read(lambda conn: conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+        return [row[-1] for row in plan]
 
     def update_user(self, user_id, name, age):
-        self.cursor.execute('UPDATE users SET name = ?, age = ? WHERE id = ?', (name, age, user_id))
-        self.conn.commit()
+        with self.pool.write_lock:
+            self.cursor.execute('UPDATE users SET name = ?, age = ? WHERE id = ?', (name, age, user_id))
+            self._invalidate([user_id])
+            self._commit()
 
     def delete_user(self, user_id):
-        self.cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-        self.conn.commit()
+        with self.pool.write_lock:
+            self.cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+            self._invalidate([user_id])
+            self._commit()
+
+    # Bulk operations: one prepared statement run for every row, one transaction
+
+    def create_users(self, users):
+        """Insert (name, age) pairs; return the number of rows inserted."""
+        with self.transaction():
+            self.cursor.executemany('INSERT INTO users (name, age) VALUES (?, ?)', users)
+            return self.cursor.rowcount
+
+    def update_users(self, users):
+        """Apply (user_id, name, age) updates; return the number of rows changed."""
+        users = list(users)
+        with self.transaction():
+            self.cursor.executemany('UPDATE users SET name = ?, age = ? WHERE id = ?',
+                                    ((name, age, user_id) for user_id, name, age in users))
+            self._invalidate(user_id for user_id, _, _ in users)
+            return self.cursor.rowcount
+
+    def delete_users(self, user_ids):
+        """Delete users by id; return the number of rows removed."""
+        user_ids = list(user_ids)
+        with self.transaction():
+            self.cursor.executemany('DELETE FROM users WHERE id = ?', ((user_id,) for user_id in user_ids))
+            self._invalidate(user_ids)
+            return self.cursor.rowcount
+
+    @contextmanager
+    def transaction(self):
+        """Group several operations into one transaction, rolled back if any of them fails.
+
+        With autocommit=False the transaction is left open for commit(), and a
+        rollback also discards earlier uncommitted writes.
+        """
+        with self.pool.write_lock:
+            if self._in_transaction:
+                # Nested: the outermost transaction commits or rolls back
+                yield self
+                return
+            self._in_transaction = True
+            try:
+                yield self
+            except BaseException:
+                self._in_transaction = False
+                self.conn.rollback()
+                if self.cache is not None:
+                    # Rows read inside the transaction may have been cached
+                    self.cache.clear()
+                raise
+            self._in_transaction = False
+            self._commit()
+
+    def commit(self):
+        with self.pool.write_lock:
+            self.conn.commit()
+
+    def cache_stats(self):
+        """Return hit/miss/eviction counters, or None when caching is off."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _invalidate(self, user_ids):
+        if self.cache is not None:
+            self.cache.invalidate(user_ids)
+
+    def _commit(self):
+        if self.autocommit and not self._in_transaction:
+            self.conn.commit()
+
+    def _read(self, query):
+        """Call `query(conn)` with this thread's read connection and return its result.
+
+        Uncommitted writes only exist on the writer connection, so while one is
+        pending (and for in-memory databases) reads go through the writer.
+        """
+        if self.pool.in_memory or self.conn.in_transaction:
+            with self.pool.write_lock:
+                return query(self.conn)
+        return query(self.pool.reader())
 
     def close(self):
-        self.conn.close()
+        self.pool.close()
 
 # -------------------------------
 # Unit Tests
@@ -71,6 +385,185 @@ class TestDatabaseCRUD(unittest.TestCase):
         user = self.db.read_user(user_id)
         self.assertIsNone(user)
 
+    def test_bulk_create_update_delete(self):
+        created = self.db.create_users([("Dave", 20), ("Eve", 21), ("Frank", 22)])
+        self.assertEqual(created, 3)
+        self.assertEqual(self.db.read_user(2)[1], "Eve")
+
+        updated = self.db.update_users([(1, "David", 30), (3, "Franklin", 32)])
+        self.assertEqual(updated, 2)
+        self.assertEqual(self.db.read_user(1)[1:], ("David", 30))
+
+        deleted = self.db.delete_users([1, 2])
+        self.assertEqual(deleted, 2)
+        self.assertIsNone(self.db.read_user(1))
+        self.assertIsNotNone(self.db.read_user(3))
+
+    def test_transaction_rolls_back_on_error(self):
+        user_id = self.db.create_user("Grace", 50)
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db.transaction():
+                self.db.update_user(user_id, "Gracie", 51)
+                self.db.create_user(None, 1)  # name is NOT NULL
+        self.assertEqual(self.db.read_user(user_id)[1:], ("Grace", 50))
+
+    def test_deferred_commit(self):
+        db = DatabaseCRUD(autocommit=False)
+        db.create_users([("Heidi", 28)])
+        db.create_user("Ivan", 33)
+        self.assertTrue(db.conn.in_transaction)
+        db.commit()
+        self.assertFalse(db.conn.in_transaction)
+        db.close()
+
+class TestDatabaseCRUDScans(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DatabaseCRUD()
+        self.db.create_users((f"user{i % 10}", i % 60) for i in range(1000))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_iter_users_pages_through_everything(self):
+        ids = [row[0] for row in self.db.iter_users(batch_size=7)]
+        self.assertEqual(ids, list(range(1, 1001)))
+        adults = list(self.db.iter_users("age >= ?", (18,), batch_size=50))
+        self.assertEqual(len(adults), sum(1 for i in range(1000) if i % 60 >= 18))
+
+    def test_find_by_name_and_age_range_use_indexes(self):
+        self.assertEqual(len(list(self.db.find_by_name("user3", batch_size=9))), 100)
+        rows = list(self.db.find_by_age_range(10, 12, batch_size=4))
+        self.assertEqual(len(rows), sum(1 for i in range(1000) if 10 <= i % 60 <= 12))
+        self.assertEqual([row[2] for row in rows], sorted(row[2] for row in rows))
+
+        plan = self.db.explain("SELECT * FROM users WHERE name = ?", ("user3",))
+        self.assertTrue(any("idx_users_name" in step for step in plan))
+        plan = self.db.explain("SELECT * FROM users WHERE age BETWEEN ? AND ?", (10, 12))
+        self.assertTrue(any("idx_users_age" in step for step in plan))
+
+    def test_iteration_memory_stays_flat(self):
+        self.db.create_users(("bulk", 1) for _ in range(50000))
+        tracemalloc.start()
+        for _ in self.db.iter_users(batch_size=500):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # A fetchall of all 51,000 rows needs several MB
+        self.assertLess(peak, 512 * 1024)
+
+
+class TestCachedDatabaseCRUD(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DatabaseCRUD(cache_size=2)
+        self.queries = []
+        self.db.conn.set_trace_callback(self.queries.append)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_cache_hits_and_invalidation(self):
+        user_id = self.db.create_user("Ken", 41)
+        self.db.read_user(user_id)
+        self.db.read_user(user_id)
+        self.assertEqual(self.db.cache_stats()["hits"], 1)
+        self.assertEqual(self.db.cache_stats()["misses"], 1)
+
+        self.db.update_user(user_id, "Kenny", 42)
+        self.assertEqual(self.db.read_user(user_id)[1], "Kenny")
+        self.db.delete_user(user_id)
+        self.assertIsNone(self.db.read_user(user_id))
+
+    def test_lru_eviction_and_ttl(self):
+        self.db.create_users([("a", 1), ("b", 2), ("c", 3)])
+        for user_id in (1, 2, 3):
+            self.db.read_user(user_id)
+        self.assertEqual(self.db.cache_stats()["evictions"], 1)
+        self.assertEqual(self.db.cache_stats()["size"], 2)
+
+        db = DatabaseCRUD(cache_size=10, cache_ttl=0)
+        user_id = db.create_user("Liz", 30)
+        db.read_user(user_id)
+        db.read_user(user_id)
+        self.assertEqual(db.cache_stats()["hits"], 0)
+        db.close()
+
+    def test_read_users_queries_only_misses(self):
+        self.db.create_users([("m", 1), ("n", 2), ("o", 3)])
+        self.db.read_user(1)
+        self.queries.clear()
+        rows = self.db.read_users([1, 2, 3, 99])
+        self.assertEqual(sorted(rows), [1, 2, 3])
+        selects = [q for q in self.queries if q.startswith("SELECT")]
+        self.assertEqual(len(selects), 1)
+        self.assertIn("IN (2, 3, 99)", selects[0])
+
+
+class TestFileBackedDatabaseCRUD(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "users.db")
+        self.db = DatabaseCRUD(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp)
+
+    def test_data_persists_across_connections(self):
+        user_id = self.db.create_user("Judy", 27)
+        self.db.close()
+        self.db = DatabaseCRUD(self.path)
+        self.assertEqual(self.db.read_user(user_id)[1:], ("Judy", 27))
+
+    def test_pragmas(self):
+        reader = self.db.pool.reader()
+        self.assertEqual(reader.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(reader.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertLess(reader.execute("PRAGMA cache_size").fetchone()[0], 0)
+
+    def test_concurrent_readers_with_writer(self):
+        ids = [self.db.create_user(f"user{i}", i) for i in range(50)]
+        errors = []
+
+        def read_all():
+            try:
+                for user_id in ids:
+                    self.assertIsNotNone(self.db.read_user(user_id))
+            except Exception as exc:
+                errors.append(exc)
+
+        readers = [threading.Thread(target=read_all) for _ in range(4)]
+        for t in readers:
+            t.start()
+        self.db.update_users((user_id, "renamed", 0) for user_id in ids)
+        for t in readers:
+            t.join()
+        self.assertEqual(errors, [])
+        # Each thread's connection was closed when the thread exited
+        self.assertEqual(len(self.db.pool._readers), 0)
+
+    def test_thread_per_request_does_not_leak_readers(self):
+        user_id = self.db.create_user("Ivan", 33)
+        opened = []
+
+        def request():
+            opened.append(self.db.pool.reader())
+            self.assertEqual(self.db.read_user(user_id)[1:], ("Ivan", 33))
+
+        for _ in range(20):
+            t = threading.Thread(target=request)
+            t.start()
+            t.join()
+        self.assertEqual(len(set(map(id, opened))), 20)
+        self.assertEqual(len(self.db.pool._readers), 0)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+        # The calling thread keeps its connection until the pool is closed
+        self.assertIs(self.db.pool.reader(), self.db.pool.reader())
+        self.assertEqual(len(self.db.pool._readers), 1)
+
 # -------------------------------
 # Run Unit Tests
 # -------------------------------
@@ -1,57 +1,669 @@
 import unittest
+import asyncio
+import fcntl
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
 
 # -------------------------------
 # Inventory Module
 # -------------------------------
 class Inventory:
-    def __init__(self):
+    """Stock levels, safe to share between threads.
+
+    Each product maps to one of `stripes` locks, so checkouts of unrelated
+    products do not wait for each other.
+    """
+
+    def __init__(self, products=None, stripes=64):
         # Product name -> quantity
         self.products = {
             "Laptop": 5,
             "Phone": 10,
             "Headphones": 15
-        }
+        } if products is None else dict(products)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._holds = {}  # hold id -> (product, quantity, expires_at)
+        self._expiry = []  # heap of (expires_at, hold id)
+        self._hold_ids = itertools.count(1)
+        self._holds_lock = threading.Lock()
+
+    def _stripe(self, product):
+        return hash(product) % len(self._locks)
 
     def check_stock(self, product, quantity):
+        self.expire_holds()
+        return self._has_stock(product, quantity)
+
+    def _has_stock(self, product, quantity):
         return self.products.get(product, 0) >= quantity
 
+    # Every stock operation first returns expired holds to stock. This is done
+    # before any stripe lock is taken, since giving stock back takes them too.
+
     def reduce_stock(self, product, quantity):
-        if self.check_stock(product, quantity):
-            self.products[product] -= quantity
-            return True
-        return False
+        self.expire_holds()
+        with self._locks[self._stripe(product)]:
+            if self._has_stock(product, quantity):
+                self.products[product] -= quantity
+                return True
+            return False
+
+    def reduce_stock_many(self, items):
+        """Take every {product: quantity} in items, or none of them.
+
+        Returns None on success, otherwise a product that is short. Stripe
+        locks are always taken in index order, so two multi-item checkouts
+        can never deadlock.
+        """
+        self.expire_holds()
+        locks = [self._locks[i] for i in sorted({self._stripe(product) for product in items})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            for product, quantity in items.items():
+                if not self._has_stock(product, quantity):
+                    return product
+            for product, quantity in items.items():
+                self.products[product] -= quantity
+            return None
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def reduce_stock_batch(self, carts):
+        """reduce_stock_many for many carts while every stripe is locked once.
+
+        Returns one result per cart (None or a short product), in order.
+        """
+        self.expire_holds()
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            results = []
+            products = self.products
+            for items in carts:
+                short = next((product for product, quantity in items.items()
+                              if products.get(product, 0) < quantity), None)
+                if short is None:
+                    for product, quantity in items.items():
+                        products[product] -= quantity
+                results.append(short)
+            return results
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def add_stock(self, product, quantity):
+        with self._locks[self._stripe(product)]:
+            self.products[product] = self.products.get(product, 0) + quantity
+
+    # Holds: stock set aside for a cart for a limited time. Held units are
+    # taken out of `products` straight away and go back when the hold expires
+    # or is released. Expiry times sit in one heap that is swept on the next
+    # reserve/expire call, so no timer runs per hold.
+
+    def reserve(self, product, quantity, ttl):
+        """Hold quantity of product for ttl seconds; returns a hold id, or None if short."""
+        if not self.reduce_stock(product, quantity):
+            return None
+        expires_at = time.monotonic() + ttl
+        with self._holds_lock:
+            hold_id = next(self._hold_ids)
+            self._holds[hold_id] = (product, quantity, expires_at)
+            heapq.heappush(self._expiry, (expires_at, hold_id))
+        return hold_id
+
+    def expire_holds(self, now=None):
+        """Return the stock of every hold past its expiry; returns how many expired."""
+        now = time.monotonic() if now is None else now
+        try:
+            # Nothing due: the common case costs one look at the heap, without the lock
+            if self._expiry[0][0] > now:
+                return 0
+        except IndexError:
+            return 0
+        expired = []
+        with self._holds_lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, hold_id = heapq.heappop(self._expiry)
+                # Committed and released holds are already gone from _holds
+                hold = self._holds.pop(hold_id, None)
+                if hold is not None:
+                    expired.append(hold)
+        for product, quantity, _ in expired:
+            self.add_stock(product, quantity)
+        return len(expired)
+
+    def release(self, hold_ids):
+        with self._holds_lock:
+            released = [self._holds.pop(hold_id) for hold_id in hold_ids if hold_id in self._holds]
+        for product, quantity, _ in released:
+            self.add_stock(product, quantity)
+
+    def _commit_locked(self, hold_ids, now):
+        for hold_id in hold_ids:
+            hold = self._holds.get(hold_id)
+            if hold is None or hold[2] <= now:
+                return hold[0] if hold is not None else hold_id
+        for hold_id in hold_ids:
+            del self._holds[hold_id]
+        return None
+
+    def commit(self, hold_ids):
+        """Turn holds into a sale, all or none.
+
+        Returns None, or the product of an expired hold (the id of an unknown one).
+        """
+        with self._holds_lock:
+            return self._commit_locked(hold_ids, time.monotonic())
+
+    def commit_batch(self, carts):
+        """commit() for many carts' hold ids under one lock; returns one result per cart."""
+        now = time.monotonic()
+        with self._holds_lock:
+            return [self._commit_locked(hold_ids, now) for hold_ids in carts]
+
+# -------------------------------
+# Persistent Sharded Inventory
+# -------------------------------
+class InventoryShard:
+    """Stock for one partition of the SKUs, kept in an append-only write-ahead log.
+
+    Every change is one JSON line {"seq": n, "ops": {product: delta}}. After
+    snapshot_every changes the stock is written to a snapshot and the log
+    starts over, so recovery replays at most that many lines. Processes
+    sharing the directory serialise on an flock and each catches up on the
+    lines the others appended before acting.
+    """
+
+    def __init__(self, prefix, snapshot_every=10000, fsync=False):
+        self.wal_path = prefix + '.wal'
+        self.snapshot_path = prefix + '.snapshot'
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.stock = {}
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._fd = None
+        self._inode = None
+        self._offset = 0
+        self._thread_lock = threading.RLock()
+        self._lock_fd = os.open(prefix + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        self._depth = 0
+
+    @contextmanager
+    def locked(self):
+        """Hold the shard exclusively, with stock brought up to date."""
+        with self._thread_lock:
+            if self._depth == 0:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._catch_up()
+                yield self.stock
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def append(self, ops):
+        """Log and apply {product: delta}; the caller must hold locked()."""
+        self.seq += 1
+        data = (json.dumps({"seq": self.seq, "ops": ops}, separators=(',', ':')) + '\n').encode()
+        os.write(self._fd, data)
+        if self.fsync:
+            os.fsync(self._fd)
+        self._offset += len(data)
+        self._apply(ops)
+        if self.seq - self.snapshot_seq >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the stock to the snapshot file and start a new, empty log (under locked())."""
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({"seq": self.seq, "stock": self.stock}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # A crash before the log is replaced is harmless: lines up to seq are skipped on replay
+        tmp = self.wal_path + '.tmp'
+        os.close(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
+        os.replace(tmp, self.wal_path)
+        self.snapshot_seq = self.seq
+        self._open_wal()
+
+    def _apply(self, ops):
+        stock = self.stock
+        for product, delta in ops.items():
+            stock[product] = stock.get(product, 0) + delta
+
+    def _catch_up(self):
+        try:
+            stat = os.stat(self.wal_path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != self._inode:
+            # First use, or another process took a snapshot and replaced the log
+            self._recover()
+        elif stat.st_size > self._offset:
+            self._replay()
+
+    def _recover(self):
+        self.stock, self.seq = {}, 0
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self.stock, self.seq = snapshot["stock"], snapshot["seq"]
+        except FileNotFoundError:
+            pass
+        self.snapshot_seq = self.seq
+        self._open_wal()
+        self._replay()
+
+    def _open_wal(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.wal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+        self._offset = 0
+
+    def _replay(self):
+        data = os.pread(self._fd, os.fstat(self._fd).st_size - self._offset, self._offset)
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            record = json.loads(line)
+            if record["seq"] > self.seq:
+                self.seq = record["seq"]
+                self._apply(record["ops"])
+        self._offset += end
+        if end < len(data):
+            # A writer died mid-line; drop the torn tail so the next append starts clean
+            os.ftruncate(self._fd, self._offset)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        os.close(self._lock_fd)
+
+
+class ShardedInventory:
+    """Inventory persisted in a directory, with SKUs hash-partitioned over shards.
+
+    Offers the stock methods of Inventory, so Carts without holds can use it,
+    and any number of processes may open the same directory (each opening it
+    itself: flocks inherited over fork() do not exclude each other). A checkout
+    spanning several shards locks them in order and is isolated, but after a
+    crash only the shards whose log line was written keep their part.
+    """
+
+    def __init__(self, directory, shards=4, products=None, snapshot_every=10000, fsync=False):
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({"shards": shards}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        with open(meta_path) as f:
+            stored = json.load(f)["shards"]
+        if stored != shards:
+            raise ValueError(f"{directory} was created with {stored} shards, not {shards}")
+        self.shards = [InventoryShard(os.path.join(directory, f'shard{i}'), snapshot_every, fsync)
+                       for i in range(shards)]
+        if products:
+            # Seed only a new store
+            with self._locked(self.shards):
+                if not any(shard.stock for shard in self.shards):
+                    for product, quantity in products.items():
+                        self._shard(product).append({product: quantity})
+
+    def _shard(self, product):
+        # crc32 rather than hash(): it must agree between processes
+        return self.shards[zlib.crc32(product.encode()) % len(self.shards)]
+
+    @contextmanager
+    def _locked(self, shards):
+        with ExitStack() as stack:
+            for shard in sorted(set(shards), key=self.shards.index):
+                stack.enter_context(shard.locked())
+            yield
+
+    @property
+    def products(self):
+        """A copy of all stock levels."""
+        products = {}
+        with self._locked(self.shards):
+            for shard in self.shards:
+                products.update(shard.stock)
+        return products
+
+    def check_stock(self, product, quantity):
+        with self._shard(product).locked() as stock:
+            return stock.get(product, 0) >= quantity
+
+    def reduce_stock(self, product, quantity):
+        return self.reduce_stock_many({product: quantity}) is None
+
+    def reduce_stock_many(self, items):
+        """Take every {product: quantity} in items, or none; returns None or a short product."""
+        return self.reduce_stock_batch([items])[0]
+
+    def reduce_stock_batch(self, carts):
+        """One result per cart, like Inventory.reduce_stock_batch; one log line per shard per cart."""
+        by_cart = []
+        for items in carts:
+            parts = {}
+            for product, quantity in items.items():
+                parts.setdefault(self._shard(product), {})[product] = quantity
+            by_cart.append(parts)
+        results = []
+        with self._locked(shard for parts in by_cart for shard in parts):
+            for parts in by_cart:
+                short = next((product for shard, part in parts.items() for product, quantity in part.items()
+                              if shard.stock.get(product, 0) < quantity), None)
+                if short is None:
+                    for shard, part in parts.items():
+                        shard.append({product: -quantity for product, quantity in part.items()})
+                results.append(short)
+        return results
+
+    def add_stock(self, product, quantity):
+        shard = self._shard(product)
+        with shard.locked():
+            shard.append({product: quantity})
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
 
 # -------------------------------
 # Cart Module
 # -------------------------------
 class Cart:
-    def __init__(self, inventory):
+    def __init__(self, inventory, hold_ttl=None):
         self.inventory = inventory
         self.items = {}  # Product -> quantity
+        # With hold_ttl, add_item reserves the stock for that many seconds
+        self.hold_ttl = hold_ttl
+        self.holds = {}  # hold id -> product, to name it once the hold is swept
 
     def add_item(self, product, quantity):
-        if self.inventory.check_stock(product, quantity):
-            self.items[product] = self.items.get(product, 0) + quantity
-            return True
-        return False
+        if self.hold_ttl is not None:
+            hold_id = self.inventory.reserve(product, quantity, self.hold_ttl)
+            if hold_id is None:
+                return False
+            self.holds[hold_id] = product
+        elif not self.inventory.check_stock(product, quantity):
+            return False
+        self.items[product] = self.items.get(product, 0) + quantity
+        return True
 
     def checkout(self):
-        for product, qty in self.items.items():
-            if not self.inventory.reduce_stock(product, qty):
-                raise ValueError(f"Not enough stock for {product}")
+        # All items are taken together, so a failed checkout leaves stock untouched
+        if self.hold_ttl is not None:
+            expired = self.inventory.commit(self.holds)
+            if expired is not None:
+                # An expired hold that was already swept comes back as its id
+                raise ValueError(f"Reservation expired for {self.holds.get(expired, expired)}")
+        else:
+            short = self.inventory.reduce_stock_many(self.items)
+            if short is not None:
+                raise ValueError(f"Not enough stock for {short}")
+        return self._clear()
+
+    async def checkout_async(self, payments, amount, idempotency_key=None):
+        """Check out and charge amount through a PaymentQueue, both or neither.
+
+        Stock is taken first, then the charge is awaited; if it fails the
+        stock goes back and the error is raised. A cart with holds is emptied
+        on failure, since its holds were used up. Returns (total items, charge id).
+
+        Cancelling the caller does not cancel the charge. The stock stays
+        taken and only goes back if the charge then fails.
+        """
+        items = dict(self.items)
+        total_items = self.checkout()
+        payment = asyncio.ensure_future(payments.submit(amount, idempotency_key or uuid.uuid4().hex))
+        try:
+            charge_id = await asyncio.shield(payment)
+        except asyncio.CancelledError:
+            payment.add_done_callback(lambda done: self._restock_if_failed(done, items))
+            raise
+        except Exception:
+            self._restock(items)
+            if self.hold_ttl is None:
+                self.items = items
+            raise
+        return total_items, charge_id
+
+    def _restock(self, items):
+        for product, quantity in items.items():
+            self.inventory.add_stock(product, quantity)
+
+    def _restock_if_failed(self, payment, items):
+        # A cancelled payment has an unknown outcome, so its stock stays taken
+        if not payment.cancelled() and payment.exception() is not None:
+            self._restock(items)
+
+    def release(self):
+        """Abandon the cart, giving held stock back straight away."""
+        self.inventory.release(self.holds)
+        self.items = {}
+        self.holds = {}
+
+    def _clear(self):
         total_items = sum(self.items.values())
         self.items = {}  # Clear cart after checkout
+        self.holds = {}
         return total_items
 
+    @staticmethod
+    def checkout_batch(carts):
+        """Check out many carts on one inventory in a single pass.
+
+        Returns each cart's item count, or None for carts that failed (those
+        keep their items). Carts with holds are committed together under one
+        lock; the others are taken from stock with every stripe locked once.
+        Raises ValueError, before touching any stock, if the carts do not all
+        share one inventory.
+        """
+        if not carts:
+            return []
+        inventory = carts[0].inventory
+        if any(cart.inventory is not inventory for cart in carts):
+            raise ValueError("checkout_batch needs carts that share one inventory")
+        held = [cart for cart in carts if cart.hold_ttl is not None]
+        plain = [cart for cart in carts if cart.hold_ttl is None]
+        failed = set()
+        # Stores without holds (ShardedInventory) have no commit_batch
+        if held:
+            for cart, result in zip(held, inventory.commit_batch([cart.holds for cart in held])):
+                if result is not None:
+                    failed.add(id(cart))
+        if plain:
+            for cart, result in zip(plain, inventory.reduce_stock_batch([cart.items for cart in plain])):
+                if result is not None:
+                    failed.add(id(cart))
+        return [None if id(cart) in failed else cart._clear() for cart in carts]
+
 # -------------------------------
 # Payment Module
 # -------------------------------
+class FakeGateway:
+    """Local stand-in for a slow payment gateway.
+
+    Every call, single or batched, takes `latency` seconds. A key that was
+    already charged gets the original charge id back instead of a second
+    charge, as with real gateways' idempotency keys. Amounts above
+    decline_over are declined with a ValueError.
+    """
+
+    def __init__(self, latency=0.05, decline_over=None):
+        self.latency = latency
+        self.decline_over = decline_over
+        self.charges = {}  # idempotency key -> (charge id, amount)
+        self.calls = 0
+        self._charge_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _charge(self, key, amount):
+        with self._lock:
+            if key in self.charges:
+                return self.charges[key][0]
+            if self.decline_over is not None and amount > self.decline_over:
+                return ValueError("Payment declined")
+            charge_id = f"ch_{next(self._charge_ids)}"
+            self.charges[key] = (charge_id, amount)
+            return charge_id
+
+    def charge(self, key, amount):
+        """Blocking single charge; returns a charge id."""
+        time.sleep(self.latency)
+        self.calls += 1
+        result = self._charge(key, amount)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def charge_batch(self, requests):
+        """Charge [(key, amount), ...] in one call; returns a charge id or exception for each."""
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        return [self._charge(key, amount) for key, amount in requests]
+
+
 class Payment:
-    def process_payment(self, amount):
-        # Simplified: always succeed if amount > 0
+    def __init__(self, gateway=None):
+        self.gateway = gateway
+
+    def process_payment(self, amount, idempotency_key=None):
         if amount <= 0:
             raise ValueError("Invalid payment amount")
-        return True
+        if self.gateway is None:
+            # Simplified: always succeed if amount > 0
+            return True
+        return self.gateway.charge(idempotency_key or uuid.uuid4().hex, amount)
+
+
+class PaymentQueue:
+    """Collects payments from many coroutines into batched gateway calls.
+
+    A batch is whatever arrived within max_wait seconds of its first payment,
+    up to max_batch, and at most max_in_flight batches are at the gateway at
+    once. Payments are keyed by idempotency key: submitting a key again
+    returns the first attempt's outcome, and batches that fail with a
+    ConnectionError or TimeoutError are retried with the same keys, so
+    nothing is charged twice. Any other gateway failure, or retries running
+    out, fails every payment in the batch and forgets their keys so they
+    can be submitted again. Use one queue per event loop and close() it when done.
+    """
+
+    def __init__(self, gateway, max_batch=100, max_wait=0.002, max_in_flight=8,
+                 retries=2, backoff=0.01, remember=100000):
+        self.gateway = gateway
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backoff = backoff
+        self.remember = remember
+        self._outcomes = OrderedDict()  # idempotency key -> future
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, amount, idempotency_key):
+        """Charge amount once per key; returns the charge id or raises the gateway's error."""
+        if amount <= 0:
+            raise ValueError("Invalid payment amount")
+        future = self._outcomes.get(idempotency_key)
+        if future is None:
+            if self._worker is None:
+                self._queue = asyncio.Queue()
+                self._worker = asyncio.create_task(self._run())
+            future = asyncio.get_running_loop().create_future()
+            self._outcomes[idempotency_key] = future
+            while len(self._outcomes) > self.remember:
+                self._outcomes.popitem(last=False)
+            self._queue.put_nowait((idempotency_key, amount, future))
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        sending = set()
+        while True:
+            batch = [await self._queue.get()]
+            if self.max_wait and batch[0] is not None:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            closing = None in batch
+            batch = [payment for payment in batch if payment is not None]
+            if batch:
+                await in_flight.acquire()
+                task = asyncio.create_task(self._send(batch))
+                sending.add(task)
+                task.add_done_callback(sending.discard)
+                task.add_done_callback(lambda _: in_flight.release())
+            if closing:
+                await asyncio.gather(*sending)
+                return
+
+    async def _send(self, batch):
+        try:
+            results = await self._charge(batch)
+        except Exception as e:
+            results = [e] * len(batch)
+            # Let a later submit with these keys try again
+            for key, _, _ in batch:
+                self._outcomes.pop(key, None)
+        try:
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                    # Retrieved here so a payment whose caller went away is not logged
+                    future.exception()
+                else:
+                    future.set_result(result)
+        finally:
+            # Never leave a caller waiting, even if this task is cancelled
+            for key, _, future in batch:
+                if not future.done():
+                    self._outcomes.pop(key, None)
+                    future.cancel()
+
+    async def _charge(self, batch):
+        """Call the gateway, retrying timeouts and lost connections with the same keys."""
+        for attempt in range(self.retries + 1):
+            try:
+                results = await self.gateway.charge_batch([(key, amount) for key, amount, _ in batch])
+            except (ConnectionError, TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            if len(results) != len(batch):
+                raise RuntimeError(f"Gateway returned {len(results)} results for {len(batch)} payments")
+            return results
+
+    async def close(self):
+        """Wait for every submitted payment to finish and stop the batching task."""
+        if self._worker is not None:
+            self._queue.put_nowait(None)
+            await self._worker
+            self._worker = None
 
 # -------------------------------
 # Unit Tests for E-Commerce System
@@ -91,6 +703,328 @@ class TestECommerceSystem(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.payment.process_payment(0)
 
+class TestConcurrentInventory(unittest.TestCase):
+
+    def test_failed_checkout_takes_nothing(self):
+        inventory = Inventory()
+        cart = Cart(inventory)
+        cart.add_item("Laptop", 2)
+        cart.add_item("Phone", 3)
+        inventory.products["Phone"] = 1
+        with self.assertRaisesRegex(ValueError, "Phone"):
+            cart.checkout()
+        self.assertEqual(inventory.products["Laptop"], 5)
+        self.assertEqual(cart.items, {"Laptop": 2, "Phone": 3})
+
+    def test_no_overselling(self):
+        inventory = Inventory({"Laptop": 100, "Phone": 100, "Headphones": 1000}, stripes=4)
+        sold = []
+
+        def shopper():
+            for _ in range(50):
+                cart = Cart(inventory)
+                cart.items = {"Laptop": 1, "Phone": 1, "Headphones": 1}
+                try:
+                    sold.append(cart.checkout())
+                except ValueError:
+                    pass
+
+        threads = [threading.Thread(target=shopper) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(sold), 100)
+        self.assertEqual(inventory.products, {"Laptop": 0, "Phone": 0, "Headphones": 900})
+
+class TestReservations(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+
+    def test_hold_takes_stock_until_checkout(self):
+        cart = Cart(self.inventory, hold_ttl=60)
+        self.assertTrue(cart.add_item("Laptop", 4))
+        self.assertEqual(self.inventory.products["Laptop"], 1)
+        self.assertFalse(Cart(self.inventory, hold_ttl=60).add_item("Laptop", 2))
+        self.assertEqual(cart.checkout(), 4)
+        self.assertEqual(self.inventory.products["Laptop"], 1)
+
+        other = Cart(self.inventory, hold_ttl=60)
+        other.add_item("Phone", 5)
+        other.release()
+        self.assertEqual(self.inventory.products["Phone"], 10)
+
+    def test_expired_hold_returns_stock(self):
+        cart = Cart(self.inventory, hold_ttl=0.01)
+        cart.add_item("Laptop", 5)
+        cart.add_item("Phone", 1)
+        time.sleep(0.02)
+        with self.assertRaisesRegex(ValueError, "expired for Laptop"):
+            cart.checkout()
+        self.assertEqual(self.inventory.expire_holds(), 2)
+        self.assertEqual(self.inventory.products["Laptop"], 5)
+        self.assertEqual(self.inventory.expire_holds(), 0)
+
+        # Every stock check sweeps expired holds, so checkout usually finds them gone
+        cart = Cart(self.inventory, hold_ttl=0.01)
+        cart.add_item("Phone", 2)
+        cart.add_item("Laptop", 1)
+        time.sleep(0.02)
+        self.assertTrue(self.inventory.check_stock("Headphones", 1))
+        with self.assertRaisesRegex(ValueError, "expired for Phone"):
+            cart.checkout()
+
+    def test_expired_holds_free_stock_for_plain_carts(self):
+        Cart(self.inventory, hold_ttl=0.01).add_item("Laptop", 5)
+        plain = Cart(self.inventory)
+        self.assertFalse(plain.add_item("Laptop", 1))
+        time.sleep(0.02)
+        self.assertTrue(plain.add_item("Laptop", 1))
+        self.assertEqual(plain.checkout(), 1)
+
+        # The same within a batch mixing held and plain carts
+        Cart(self.inventory, hold_ttl=0.01).add_item("Phone", 10)
+        held = Cart(self.inventory, hold_ttl=60)
+        self.assertFalse(held.add_item("Phone", 2))
+        self.assertTrue(held.add_item("Headphones", 2))
+        plain = Cart(self.inventory)
+        plain.items = {"Phone": 4}
+        time.sleep(0.02)
+        self.assertEqual(Cart.checkout_batch([held, plain]), [2, 4])
+        self.assertEqual(self.inventory.products["Phone"], 6)
+
+    def test_checkout_batch(self):
+        held = [Cart(self.inventory, hold_ttl=60) for _ in range(3)]
+        for cart in held:
+            cart.add_item("Phone", 3)
+        plain = [Cart(self.inventory) for _ in range(4)]
+        for cart in plain:
+            cart.add_item("Headphones", 5)
+        results = Cart.checkout_batch(held + plain)
+        self.assertEqual(results, [3, 3, 3, 5, 5, 5, None])
+        self.assertEqual(self.inventory.products["Phone"], 1)
+        self.assertEqual(self.inventory.products["Headphones"], 0)
+        self.assertEqual(plain[-1].items, {"Headphones": 5})
+
+        other = Cart(Inventory())
+        other.add_item("Phone", 1)
+        mine = Cart(self.inventory, hold_ttl=60)
+        mine.add_item("Phone", 1)
+        with self.assertRaisesRegex(ValueError, "share one inventory"):
+            Cart.checkout_batch([mine, other])
+        self.assertEqual((mine.items, other.items), ({"Phone": 1}, {"Phone": 1}))
+        self.assertEqual(self.inventory.products["Phone"], 0)
+        self.assertEqual(other.inventory.products["Phone"], 10)
+
+def _sharded_shopper(directory, attempts):
+    inventory = ShardedInventory(directory)
+    for _ in range(attempts):
+        cart = Cart(inventory)
+        cart.items = {"Laptop": 1, "Phone": 1}
+        try:
+            cart.checkout()
+        except ValueError:
+            pass
+    inventory.close()
+
+
+class TestShardedInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_survives_restart(self):
+        inventory = ShardedInventory(self.tmp, products=Inventory().products, snapshot_every=3)
+        cart = Cart(inventory)
+        self.assertTrue(cart.add_item("Laptop", 2))
+        self.assertTrue(cart.add_item("Phone", 3))
+        self.assertEqual(cart.checkout(), 5)
+        # A failed checkout logs nothing
+        cart.items = {"Laptop": 3, "Headphones": 99}
+        with self.assertRaises(ValueError):
+            cart.checkout()
+        inventory.close()
+        self.assertTrue(any(name.endswith('.snapshot') for name in os.listdir(self.tmp)))
+
+        # A half-written line from a crashed process is ignored
+        with open(os.path.join(self.tmp, 'shard0.wal'), 'a') as f:
+            f.write('{"seq": 99, "ops": {"Lap')
+        reopened = ShardedInventory(self.tmp, products={"Laptop": 1000})
+        self.assertEqual(reopened.products, {"Laptop": 3, "Phone": 7, "Headphones": 15})
+        reopened.add_stock("Laptop", 1)
+        reopened.close()
+        self.assertEqual(ShardedInventory(self.tmp).products["Laptop"], 4)
+
+        with self.assertRaises(ValueError):
+            ShardedInventory(self.tmp, shards=8)
+
+    def test_checkout_batch(self):
+        inventory = ShardedInventory(self.tmp, products={"Laptop": 3, "Phone": 10})
+        carts = []
+        for quantity in (1, 2, 1):
+            cart = Cart(inventory)
+            cart.add_item("Laptop", quantity)
+            cart.add_item("Phone", quantity)
+            carts.append(cart)
+        self.assertEqual(Cart.checkout_batch(carts), [2, 4, None])
+        self.assertEqual(carts[-1].items, {"Laptop": 1, "Phone": 1})
+        inventory.close()
+        self.assertEqual(ShardedInventory(self.tmp).products, {"Laptop": 0, "Phone": 7})
+
+    def test_worker_processes(self):
+        ShardedInventory(self.tmp, products={"Laptop": 100, "Phone": 1000}, snapshot_every=25).close()
+        workers = [multiprocessing.Process(target=_sharded_shopper, args=(self.tmp, 50)) for _ in range(4)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+        self.assertEqual(ShardedInventory(self.tmp).products, {"Laptop": 0, "Phone": 900})
+
+class LostResponseGateway(FakeGateway):
+    """Charges the batch, then fails the first `failures` calls as if the reply was lost."""
+
+    def __init__(self, failures):
+        super().__init__(latency=0)
+        self.failures = failures
+
+    async def charge_batch(self, requests):
+        results = await super().charge_batch(requests)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("gateway timed out")
+        return results
+
+
+class TestPaymentQueue(unittest.TestCase):
+
+    def test_batches_and_idempotency(self):
+        gateway = FakeGateway(latency=0.01)
+
+        async def main():
+            payments = PaymentQueue(gateway, max_batch=50, max_in_flight=2)
+            charges = await asyncio.gather(*(payments.submit(10, f"order{i % 100}") for i in range(200)))
+            again = await payments.submit(10, "order7")
+            await payments.close()
+            return charges, again
+
+        charges, again = asyncio.run(main())
+        self.assertEqual(len(gateway.charges), 100)
+        self.assertEqual(charges[7], charges[107])
+        self.assertEqual(again, charges[7])
+        self.assertLessEqual(gateway.calls, 4)
+
+    def test_retry_never_double_charges(self):
+        gateway = LostResponseGateway(failures=2)
+
+        async def main():
+            payments = PaymentQueue(gateway, backoff=0)
+            charge = await payments.submit(25, "order1")
+            await payments.close()
+            return charge
+
+        self.assertEqual(asyncio.run(main()), "ch_1")
+        self.assertEqual(list(gateway.charges), ["order1"])
+        self.assertEqual(gateway.calls, 3)
+
+    def test_gateway_failure_fails_the_batch(self):
+        class BrokenGateway(FakeGateway):
+            def __init__(self, error):
+                super().__init__(latency=0)
+                self.error = error
+                self.failures = 0
+
+            async def charge_batch(self, requests):
+                if self.error is not None:
+                    self.failures += 1
+                    raise self.error
+                return await super().charge_batch(requests)
+
+        # TimeoutError is retried before giving up; RuntimeError is not
+        for error, failures in ((TimeoutError("gateway too slow"), 3), (RuntimeError("gateway bug"), 1)):
+            gateway = BrokenGateway(error)
+
+            async def main():
+                payments = PaymentQueue(gateway, backoff=0)
+                results = await asyncio.wait_for(
+                    asyncio.gather(payments.submit(10, "k1"), payments.submit(20, "k2"),
+                                   return_exceptions=True), 1)
+                # The keys were forgotten, so the same payment can go through later
+                gateway.error = None
+                retry = await asyncio.wait_for(payments.submit(10, "k1"), 1)
+                await payments.close()
+                return results, retry
+
+            results, retry = asyncio.run(main())
+            self.assertEqual([type(r) for r in results], [type(error)] * 2)
+            self.assertEqual(retry, "ch_1")
+            self.assertEqual(gateway.failures, failures)
+
+    def test_short_gateway_reply_fails_the_batch(self):
+        class ShortGateway(FakeGateway):
+            async def charge_batch(self, requests):
+                return (await super().charge_batch(requests))[:-1]
+
+        async def main():
+            payments = PaymentQueue(ShortGateway(latency=0))
+            results = await asyncio.wait_for(asyncio.gather(
+                payments.submit(10, "k1"), payments.submit(20, "k2"), return_exceptions=True), 1)
+            await payments.close()
+            return results
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in asyncio.run(main())))
+
+    def test_checkout_async(self):
+        inventory = Inventory()
+        gateway = FakeGateway(latency=0, decline_over=1000)
+
+        async def main():
+            payments = PaymentQueue(gateway)
+            paid = Cart(inventory)
+            paid.add_item("Laptop", 2)
+            declined = Cart(inventory)
+            declined.add_item("Phone", 4)
+            results = await asyncio.gather(paid.checkout_async(payments, 900, "order1"),
+                                           declined.checkout_async(payments, 5000, "order2"),
+                                           return_exceptions=True)
+            await payments.close()
+            return results, declined
+
+        (paid, declined_error), declined = asyncio.run(main())
+        self.assertEqual(paid, (2, "ch_1"))
+        self.assertIsInstance(declined_error, ValueError)
+        self.assertEqual(inventory.products, {"Laptop": 3, "Phone": 10, "Headphones": 15})
+        self.assertEqual(declined.items, {"Phone": 4})
+        self.assertEqual(Payment(gateway).process_payment(10, "order1"), "ch_1")
+
+    def test_cancelled_checkout_keeps_paid_stock(self):
+        inventory = Inventory()
+        gateway = FakeGateway(latency=0.05, decline_over=1000)
+
+        async def main():
+            payments = PaymentQueue(gateway)
+            paid = Cart(inventory)
+            paid.add_item("Laptop", 2)
+            declined = Cart(inventory)
+            declined.add_item("Phone", 4)
+            for cart, amount, key in ((paid, 100, "order1"), (declined, 5000, "order2")):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(cart.checkout_async(payments, amount, key), 0.01)
+            # Both charges are still at the gateway
+            self.assertEqual(inventory.products, {"Laptop": 3, "Phone": 6, "Headphones": 15})
+            await payments.close()
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        self.assertIn("order1", gateway.charges)
+        self.assertNotIn("order2", gateway.charges)
+        # The paid cart's stock stays sold, the declined one's goes back
+        self.assertEqual(inventory.products, {"Laptop": 3, "Phone": 10, "Headphones": 15})
+
 # -------------------------------
 # Run Unit Tests
 # -------------------------------
@@ -3,34 +3,68 @@
 # ============================================
 
 import unittest
+import zlib
+
+# Rollout percentages are resolved to 1/100 of a percent
+ROLLOUT_BUCKETS = 10000
+
+
+def _user_hash(user):
+    return zlib.crc32(str(user).encode())
+
+
+def _in_rollout(user_hash, salt, threshold):
+    # Mix in the feature's salt so each feature picks a different slice of users
+    return ((user_hash ^ salt) * 0x9E3779B1 & 0xFFFFFFFF) % ROLLOUT_BUCKETS < threshold
+
 
 class FeatureFlagSystem:
-    """System to manage feature flags for alpha testers."""
+    """System to manage feature flags for alpha testers.
+
+    Each feature owns one bit. Users' assignments are kept as one integer
+    bitset per user, and globally enabled features as another, so a check is
+    a dict lookup and an AND whatever the number of flags. Percentage
+    rollouts hash the user instead of storing anything per user.
+    """
     
     def __init__(self):
         # Stores features and whether they are enabled (True) or disabled (False)
         self.features = {}
-        # Optional: map users to features if testing user-based rollout
+        # Optional: map users to features if testing user-based rollout (bitset of feature bits)
         self.user_features = {}
+        # Feature -> percentage of all users it is rolled out to
+        self.rollouts = {}
+        self._bits = {}
+        self._enabled = 0
+        self._rollout_table = {}  # feature -> (bit, salt, threshold), for rolled-out features
+        self._names = {}  # bit -> feature
+        self._all_off = {}  # every feature -> False, copied by evaluate_all
+
+    def _bit(self, feature_name):
+        bit = self._bits.get(feature_name)
+        if bit is None:
+            raise ValueError("Feature not found.")
+        return bit
 
     def add_feature(self, feature_name):
         """Add a new feature (disabled by default)."""
         if feature_name in self.features:
             raise ValueError("Feature already exists.")
         self.features[feature_name] = False
+        bit = self._bits[feature_name] = 1 << len(self._bits)
+        self._names[bit] = feature_name
+        self._all_off[feature_name] = False
         return True
 
     def enable_feature(self, feature_name):
         """Enable a feature globally."""
-        if feature_name not in self.features:
-            raise ValueError("Feature not found.")
+        self._enabled |= self._bit(feature_name)
         self.features[feature_name] = True
         return True
 
     def disable_feature(self, feature_name):
         """Disable a feature globally."""
-        if feature_name not in self.features:
-            raise ValueError("Feature not found.")
+        self._enabled &= ~self._bit(feature_name)
         self.features[feature_name] = False
         return True
 
@@ -39,21 +73,63 @@ class FeatureFlagSystem:
         return self.features.get(feature_name, False)
 
     def assign_feature_to_user(self, user, feature_name):
-        """Assign a specific feature to an alpha tester."""
-        if feature_name not in self.features:
-            raise ValueError("Feature not found.")
-        if user not in self.user_features:
-            self.user_features[user] = []
-        self.user_features[user].append(feature_name)
+        """Assign a specific feature to an alpha tester (assigning twice changes nothing)."""
+        self.user_features[user] = self.user_features.get(user, 0) | self._bit(feature_name)
+        return True
+
+    def set_rollout(self, feature_name, percentage):
+        """Also give the feature to a stable `percentage` of all users (0 turns it off)."""
+        bit = self._bit(feature_name)
+        if not 0 <= percentage <= 100:
+            raise ValueError("Rollout percentage must be between 0 and 100.")
+        if percentage:
+            self.rollouts[feature_name] = percentage
+            self._rollout_table[feature_name] = (bit, _user_hash(feature_name),
+                                                 round(percentage * ROLLOUT_BUCKETS / 100))
+        else:
+            self.rollouts.pop(feature_name, None)
+            self._rollout_table.pop(feature_name, None)
         return True
 
+    def _user_mask(self, user):
+        """Bits of every feature assigned or rolled out to user, enabled or not."""
+        mask = self.user_features.get(user, 0)
+        if self._rollout_table:
+            user_hash = _user_hash(user)
+            for bit, salt, threshold in self._rollout_table.values():
+                if _in_rollout(user_hash, salt, threshold):
+                    mask |= bit
+        return mask
+
     def is_feature_enabled_for_user(self, user, feature_name):
         """Check if a feature is enabled for a specific user."""
-        # Feature must be globally enabled AND assigned to user
-        return (
-            self.features.get(feature_name, False) and
-            feature_name in self.user_features.get(user, [])
-        )
+        # Feature must be globally enabled AND assigned (or rolled out) to user
+        bit = self._bits.get(feature_name, 0)
+        if not self._enabled & bit:
+            return False
+        if self.user_features.get(user, 0) & bit:
+            return True
+        rollout = self._rollout_table.get(feature_name)
+        return rollout is not None and _in_rollout(_user_hash(user), rollout[1], rollout[2])
+
+    def _enabled_names(self, mask):
+        # Visit only the set bits, lowest first
+        names = self._names
+        while mask:
+            bit = mask & -mask
+            yield names[bit]
+            mask ^= bit
+
+    def evaluate_all(self, user):
+        """Return {feature: enabled for user} for every feature in one call."""
+        flags = self._all_off.copy()
+        for name in self._enabled_names(self._user_mask(user) & self._enabled):
+            flags[name] = True
+        return flags
+
+    def enabled_features(self, user):
+        """The set of features enabled for user; cheaper than evaluate_all when few are on."""
+        return set(self._enabled_names(self._user_mask(user) & self._enabled))
 
 
 # ============================================
@@ -102,6 +178,45 @@ class TestFeatureFlagSystem(unittest.TestCase):
         result = self.system.is_feature_enabled_for_user("tester2", "VoiceCommand")
         self.assertFalse(result)
 
+    def test_assigning_twice_is_harmless(self):
+        """Test that repeated assignments do not pile up."""
+        self.system.add_feature("DarkMode")
+        for _ in range(3):
+            self.system.assign_feature_to_user("tester1", "DarkMode")
+        self.assertEqual(self.system.user_features["tester1"], 1)
+        with self.assertRaises(ValueError):
+            self.system.assign_feature_to_user("tester1", "Missing")
+
+    def test_percentage_rollout(self):
+        """Test that rollouts reach about the right share of users, the same ones every time."""
+        self.system.add_feature("NewCheckout")
+        self.system.enable_feature("NewCheckout")
+        self.system.set_rollout("NewCheckout", 25)
+        users = [f"user{i}" for i in range(20000)]
+        enabled = [u for u in users if self.system.is_feature_enabled_for_user(u, "NewCheckout")]
+        self.assertAlmostEqual(len(enabled) / len(users), 0.25, delta=0.02)
+        self.assertEqual(enabled, [u for u in users if self.system.is_feature_enabled_for_user(u, "NewCheckout")])
+
+        self.system.set_rollout("NewCheckout", 0)
+        self.assertFalse(self.system.is_feature_enabled_for_user(enabled[0], "NewCheckout"))
+        with self.assertRaises(ValueError):
+            self.system.set_rollout("NewCheckout", 101)
+
+    def test_evaluate_all(self):
+        """Test that evaluate_all agrees with single checks."""
+        for name in ("A", "B", "C", "D"):
+            self.system.add_feature(name)
+        for name in ("A", "B", "C"):
+            self.system.enable_feature(name)
+        self.system.assign_feature_to_user("tester1", "A")
+        self.system.assign_feature_to_user("tester1", "D")
+        self.system.set_rollout("C", 100)
+        flags = self.system.evaluate_all("tester1")
+        self.assertEqual(flags, {"A": True, "B": False, "C": True, "D": False})
+        for name, value in flags.items():
+            self.assertEqual(self.system.is_feature_enabled_for_user("tester1", name), value)
+        self.assertEqual(self.system.enabled_features("tester1"), {"A", "C"})
+
 
 # ============================================
 # Run Unit Tests (Simulating Alpha Testing)
@@ -0,0 +1,38 @@
+import time
+
+from Q3d import DatabaseCRUD
+
+# -------------------------------
+# DatabaseCRUD bulk insert benchmark: one commit per row vs one batched transaction
+# -------------------------------
+
+# Set the number of rows
+n = 100000
+rows = [(f"user{i}", i % 100) for i in range(n)]
+
+
+def insert_per_row(db):
+    for name, age in rows:
+        db.create_user(name, age)
+
+
+def insert_batched(db):
+    db.create_users(rows)
+
+
+def measure_rows_per_second(func):
+    db = DatabaseCRUD()
+    start_time = time.time()
+    func(db)
+    execution_time = time.time() - start_time
+    db.close()
+    return n / execution_time, execution_time
+
+
+per_row_rate, per_row_time = measure_rows_per_second(insert_per_row)
+print(f"Per-row inserts: {n} rows in {per_row_time:.3f} seconds ({per_row_rate:,.0f} rows/sec)")
+
+batched_rate, batched_time = measure_rows_per_second(insert_batched)
+print(f"Batched inserts: {n} rows in {batched_time:.3f} seconds ({batched_rate:,.0f} rows/sec)")
+
+print(f"Batched inserts are {batched_rate / per_row_rate:.1f}x faster.")
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from Q3d import DatabaseCRUD
+
+# -------------------------------
+# File-backed DatabaseCRUD: read throughput vs number of reader threads
+# -------------------------------
+
+# Set the table size and the number of reads each thread performs
+n_users = 100000
+reads_per_thread = 20000
+
+tmp = tempfile.mkdtemp()
+db = DatabaseCRUD(os.path.join(tmp, "users.db"))
+db.create_users((f"user{i}", i % 100) for i in range(n_users))
+
+
+def reader(seed):
+    user_id = seed
+    for _ in range(reads_per_thread):
+        user_id = (user_id * 7919 + 1) % n_users + 1
+        db.read_user(user_id)
+
+
+def measure_reads_per_second(threads):
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    start_time = time.time()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    execution_time = time.time() - start_time
+    return threads * reads_per_thread / execution_time
+
+
+# Keep one writer busy in the background, as in production
+stop = threading.Event()
+
+
+def writer():
+    i = 0
+    while not stop.is_set():
+        db.update_user(i % n_users + 1, f"renamed{i}", i % 100)
+        i += 1
+        time.sleep(0.001)
+
+
+writer_thread = threading.Thread(target=writer)
+writer_thread.start()
+
+baseline = None
+for threads in (1, 2, 4, 8):
+    rate = measure_reads_per_second(threads)
+    baseline = baseline or rate
+    print(f"{threads} reader thread(s): {rate:,.0f} reads/sec ({rate / baseline:.2f}x)")
+
+stop.set()
+writer_thread.join()
+db.close()
+shutil.rmtree(tmp)
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Q3b import FileProcessor
+
+# -------------------------------
+# Peak memory of FileProcessor: whole-file vs streaming
+# -------------------------------
+# python Q5f.py [size_mb ...]   (default: 16 256 2048)
+
+sizes_mb = [int(arg) for arg in sys.argv[1:]] or [16, 256, 2048]
+LINE = "hello wörld, streaming ✓ test line\n"
+processor = FileProcessor()
+
+
+def whole_file(src, dst):
+    data = processor.read_file(src)
+    processor.write_file(dst, processor.process_data(data))
+
+
+def streaming(src, dst):
+    processor.process_file(src, dst, chunk_size=64 * 1024)
+
+
+def measure(func, src, dst):
+    tracemalloc.start()  # Start tracking memory
+    start_time = time.time()
+    func(src, dst)
+    execution_time = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()  # Stop tracking memory
+    return peak, execution_time
+
+
+tmp = tempfile.mkdtemp()
+src = os.path.join(tmp, "input.txt")
+dst = os.path.join(tmp, "output.txt")
+try:
+    for size_mb in sizes_mb:
+        with open(src, 'w', encoding='utf-8') as f:
+            block = LINE * (1024 * 1024 // len(LINE.encode('utf-8')))
+            for _ in range(size_mb):
+                f.write(block)
+
+        peak, seconds = measure(streaming, src, dst)
+        print(f"{size_mb:>5} MB streaming:  peak {peak / 1024:10.2f} KB ({seconds:.1f} s)")
+        # Loading everything needs several copies of the file, so only try it on small inputs
+        if size_mb <= 64:
+            peak, seconds = measure(whole_file, src, dst)
+            print(f"{size_mb:>5} MB whole file: peak {peak / 1024:10.2f} KB ({seconds:.1f} s)")
+finally:
+    for path in (src, dst):
+        if os.path.exists(path):
+            os.remove(path)
+    os.rmdir(tmp)
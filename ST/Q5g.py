@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import time
+
+from Q3b import FileProcessor
+
+# -------------------------------
+# FileProcessor throughput: streaming vs parallel with 1..N workers
+# -------------------------------
+# python Q5g.py [size_mb]   (default: 256)
+
+size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+LINE = "hello world, parallel file processing line\n"
+processor = FileProcessor()
+
+
+def measure_throughput(func, *args):
+    start_time = time.time()
+    func(*args)
+    execution_time = time.time() - start_time
+    return size_mb / execution_time, execution_time
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    src = os.path.join(tmp, "input.txt")
+    dst = os.path.join(tmp, "output.txt")
+    with open(src, 'w') as f:
+        block = LINE * (1024 * 1024 // len(LINE))
+        for _ in range(size_mb):
+            f.write(block)
+
+    rate, seconds = measure_throughput(processor.process_file, src, dst)
+    print(f"Streaming, 1 process: {rate:8.1f} MB/s ({seconds:.2f} s)")
+
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for workers in worker_counts:
+        rate, seconds = measure_throughput(processor.process_file_parallel, src, dst, workers)
+        print(f"Parallel, {workers:>2} workers: {rate:8.1f} MB/s ({seconds:.2f} s)")
+
+    os.remove(src)
+    os.remove(dst)
+    os.rmdir(tmp)
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import time
+
+from Q3b import FileProcessor, ascii_upper
+
+# -------------------------------
+# FileProcessor pipeline: bytes fast path vs decoded str path
+# -------------------------------
+# python Q5h.py [size_mb]   (default: 128)
+
+size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+LINE = "hello world, transform pipeline benchmark line\n"
+COMMENT = "# comment line that the filter drops\n"
+
+
+def not_comment(line):
+    return not line.startswith('#')
+
+
+def not_comment_bytes(line):
+    return not line.startswith(b'#')
+
+
+PIPELINES = {
+    "upper": FileProcessor(),
+    "filter + upper": FileProcessor(stages=[]).add_filter(not_comment, not_comment_bytes)
+                                              .add_map(str.upper, ascii_upper, ascii_only=True),
+}
+
+
+def measure_throughput(func, *args, **kwargs):
+    start_time = time.time()
+    func(*args, **kwargs)
+    execution_time = time.time() - start_time
+    return size_mb / execution_time, execution_time
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    src = os.path.join(tmp, "input.txt")
+    dst = os.path.join(tmp, "output.txt")
+    with open(src, 'w') as f:
+        block = (LINE * 9 + COMMENT) * (1024 * 1024 // (len(LINE) * 9 + len(COMMENT)))
+        for _ in range(size_mb):
+            f.write(block)
+
+    for name, processor in PIPELINES.items():
+        for label, fast in (("bytes", True), ("str", False)):
+            rate, seconds = measure_throughput(processor.process_file, src, dst, fast=fast)
+            print(f"{name:<15} {label:<5}: {rate:8.1f} MB/s ({seconds:.2f} s)")
+
+    os.remove(src)
+    os.remove(dst)
+    os.rmdir(tmp)
@@ -0,0 +1,45 @@
+import asyncio
+import sys
+import time
+
+from Q3c import APIClient, InMemoryTransport
+
+# -------------------------------
+# APIClient: 1,000 fetches against a stand-in server with injected latency
+# -------------------------------
+# python Q5i.py [latency_ms]   (default: 5)
+
+n_fetches = 1000
+latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 5.0) / 1000
+connect_latency = 4 * latency
+
+
+API_DATA = APIClient().api_data
+
+
+def make_client(pool_size=100):
+    transport = InMemoryTransport(API_DATA, latency, connect_latency)
+    return APIClient(transport, pool_size=pool_size), transport
+
+
+async def sequential(client):
+    for _ in range(n_fetches):
+        await client.fetch("users")
+
+
+def measure(label, coroutine_factory, pool_size=100):
+    client, transport = make_client(pool_size)
+    start_time = time.time()
+    asyncio.run(coroutine_factory(client))
+    execution_time = time.time() - start_time
+    print(f"{label:<28} {execution_time:7.3f} s  ({transport.connects} connections)")
+
+
+if __name__ == "__main__":
+    print(f"{n_fetches} fetches, {latency * 1000:.1f} ms per request, "
+          f"{connect_latency * 1000:.1f} ms per new connection")
+    measure("Sequential, keep-alive", sequential)
+    measure("Sequential, no keep-alive", sequential, pool_size=0)
+    for concurrency in (10, 100):
+        measure(f"Concurrent ({concurrency}), keep-alive",
+                lambda client: client.fetch_many(["users"] * n_fetches, concurrency))
@@ -0,0 +1,95 @@
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from Q3c import APIClient, RecordSpec, iter_json_array, iter_ndjson
+
+# -------------------------------
+# APIClient.process_data: whole payload vs streaming, throughput and peak memory
+# -------------------------------
+# python Q5j.py [n_records]   (default: 10000000)
+# Each run happens in a fresh process so its peak RSS is its own.
+
+n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+CHUNK = 64 * 1024
+client = APIClient()
+CITY_SPEC = RecordSpec(["name", "address.city"], defaults={"address.city": "?"})
+
+
+def make_record(i):
+    record = {"age": i % 90, "address": {"city": f"city{i % 1000}"}}
+    if i % 10:
+        record["name"] = f"user{i}"
+    return record
+
+
+def whole_payload(array_file, ndjson_file):
+    with open(array_file) as f:
+        return len(client.process_data(json.load(f)))
+
+
+def stream_ndjson(array_file, ndjson_file):
+    with open(ndjson_file) as f:
+        return sum(1 for _ in client.iter_process_data(iter_ndjson(f)))
+
+
+def stream_ndjson_two_fields(array_file, ndjson_file):
+    with open(ndjson_file) as f:
+        return sum(1 for _ in client.iter_process_data(iter_ndjson(f), CITY_SPEC))
+
+
+def stream_array(array_file, ndjson_file):
+    with open(array_file) as f:
+        records = iter_json_array(iter(lambda: f.read(CHUNK), ''))
+        return sum(1 for _ in client.iter_process_data(records))
+
+
+def run(func, files, results):
+    start_time = time.time()
+    count = func(*files)
+    execution_time = time.time() - start_time
+    # ru_maxrss is in KiB on Linux
+    results.put((count, execution_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))
+
+
+def measure(func, files):
+    results = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=run, args=(func, files, results))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        return None
+    return results.get()
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    files = (os.path.join(tmp, "records.json"), os.path.join(tmp, "records.ndjson"))
+    with open(files[0], 'w') as array, open(files[1], 'w') as ndjson:
+        array.write("[")
+        for i in range(n_records):
+            line = json.dumps(make_record(i))
+            array.write(("," if i else "") + line + "\n")
+            ndjson.write(line + "\n")
+        array.write("]")
+
+    print(f"{n_records} records, {os.path.getsize(files[1]) / 1024 ** 2:.0f} MB of NDJSON")
+    for label, func in [("Whole payload (json.load)", whole_payload),
+                        ("Streaming NDJSON", stream_ndjson),
+                        ("Streaming NDJSON, 2 fields", stream_ndjson_two_fields),
+                        ("Streaming chunked array", stream_array)]:
+        result = measure(func, files)
+        if result is None:
+            print(f"{label:<28} failed (out of memory?)")
+            continue
+        count, seconds, peak = result
+        print(f"{label:<28} {n_records / seconds:10.0f} records/s  "
+              f"peak RSS {peak / 1024 ** 2:8.1f} MB  ({count} extracted)")
+
+    for path in files:
+        os.remove(path)
+    os.rmdir(tmp)
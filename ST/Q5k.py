@@ -0,0 +1,59 @@
+import random
+import sys
+import threading
+import time
+
+from Q3e import Cart, Inventory
+
+# -------------------------------
+# Inventory stress test: concurrent multi-item checkouts, 1 lock vs striped locks
+# -------------------------------
+# python Q5k.py [threads]   (default: 8)
+
+n_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+n_products = 1000
+stock_per_product = 200
+checkouts_per_thread = 20000
+
+
+def shopper(inventory, seed, sold):
+    rng = random.Random(seed)
+    taken = {}
+    for _ in range(checkouts_per_thread):
+        cart = Cart(inventory)
+        for product in rng.sample(range(n_products), rng.randint(1, 3)):
+            cart.items[f"sku{product}"] = rng.randint(1, 3)
+        items = cart.items
+        try:
+            cart.checkout()
+        except ValueError:
+            continue
+        for product, quantity in items.items():
+            taken[product] = taken.get(product, 0) + quantity
+    sold.append(taken)
+
+
+def measure(stripes):
+    inventory = Inventory({f"sku{i}": stock_per_product for i in range(n_products)}, stripes)
+    sold = []
+    threads = [threading.Thread(target=shopper, args=(inventory, i, sold)) for i in range(n_threads)]
+    start_time = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    execution_time = time.time() - start_time
+
+    # Every unit sold must have come out of stock, and no stock may go negative
+    for i in range(n_products):
+        product = f"sku{i}"
+        total = sum(taken.get(product, 0) for taken in sold)
+        assert inventory.products[product] >= 0, f"{product} oversold"
+        assert inventory.products[product] + total == stock_per_product, f"{product} inconsistent"
+    return n_threads * checkouts_per_thread / execution_time
+
+
+if __name__ == "__main__":
+    for stripes in (1, 16, 256):
+        rate = measure(stripes)
+        print(f"{stripes:>3} lock(s), {n_threads} threads: {rate:10.0f} checkouts/s, no overselling")
@@ -0,0 +1,60 @@
+import random
+import sys
+import time
+
+from Q3e import Cart, Inventory
+
+# -------------------------------
+# Flash sale: a burst of 10k carts against limited stock
+# -------------------------------
+# python Q5l.py [carts]   (default: 10000)
+# Every cart adds 1-3 products, 10% abandon, the rest check out. Without
+# holds add_item only peeks at stock, so most failures happen at checkout.
+
+n_carts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+n_products = 20
+stock_per_product = 600
+
+
+def fill_carts(inventory, hold_ttl, seed=1):
+    rng = random.Random(seed)
+    carts, rejected = [], 0
+    for _ in range(n_carts):
+        cart = Cart(inventory, hold_ttl)
+        for product in rng.sample(range(n_products), rng.randint(1, 3)):
+            if not cart.add_item(f"sku{product}", rng.randint(1, 2)):
+                rejected += 1
+        if rng.random() < 0.1:
+            cart.release()
+        elif cart.items:
+            carts.append(cart)
+    return carts, rejected
+
+
+def one_by_one(carts):
+    results = []
+    for cart in carts:
+        try:
+            results.append(cart.checkout())
+        except ValueError:
+            results.append(None)
+    return results
+
+
+def run(label, hold_ttl, checkout):
+    inventory = Inventory({f"sku{i}": stock_per_product for i in range(n_products)})
+    start_time = time.time()
+    carts, rejected = fill_carts(inventory, hold_ttl)
+    results = checkout(carts)
+    execution_time = time.time() - start_time
+    failed = results.count(None)
+    print(f"{label:<26} {n_carts / execution_time:9.0f} carts/s  "
+          f"rejected at add_item {rejected:5}  failed at checkout {failed:5} "
+          f"({failed / len(carts):6.1%})")
+
+
+if __name__ == "__main__":
+    run("No holds, one by one", None, one_by_one)
+    run("No holds, batch", None, Cart.checkout_batch)
+    run("Holds, one by one", 30, one_by_one)
+    run("Holds, batch", 30, Cart.checkout_batch)
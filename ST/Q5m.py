@@ -0,0 +1,66 @@
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from Q3e import Cart, ShardedInventory
+
+# -------------------------------
+# ShardedInventory: checkouts/s by shard count, and restart recovery time
+# -------------------------------
+# python Q5m.py [processes]   (default: 4)
+
+n_processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+n_products = 1000
+checkouts_per_process = 5000
+PRODUCTS = {f"sku{i}": 10 ** 6 for i in range(n_products)}
+
+
+def shopper(directory, shards, seed):
+    inventory = ShardedInventory(directory, shards)
+    rng = random.Random(seed)
+    for _ in range(checkouts_per_process):
+        cart = Cart(inventory)
+        cart.items = {f"sku{rng.randrange(n_products)}": 1}
+        cart.checkout()
+    inventory.close()
+
+
+def measure_throughput(shards):
+    directory = tempfile.mkdtemp()
+    ShardedInventory(directory, shards, PRODUCTS).close()
+    workers = [multiprocessing.Process(target=shopper, args=(directory, shards, i)) for i in range(n_processes)]
+    start_time = time.time()
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    execution_time = time.time() - start_time
+    shutil.rmtree(directory)
+    return n_processes * checkouts_per_process / execution_time
+
+
+def measure_recovery(snapshot_every, changes=100000):
+    directory = tempfile.mkdtemp()
+    inventory = ShardedInventory(directory, 1, PRODUCTS, snapshot_every)
+    for i in range(changes):
+        inventory.reduce_stock(f"sku{i % n_products}", 1)
+    inventory.close()
+    start_time = time.time()
+    ShardedInventory(directory, 1).products
+    execution_time = time.time() - start_time
+    shutil.rmtree(directory)
+    return execution_time
+
+
+if __name__ == "__main__":
+    for shards in (1, 2, 4, 8):
+        rate = measure_throughput(shards)
+        print(f"{shards} shard(s), {n_processes} processes: {rate:9.0f} checkouts/s")
+
+    for snapshot_every in (1000, 10000, 100000, 10 ** 9):
+        seconds = measure_recovery(snapshot_every)
+        label = "never" if snapshot_every == 10 ** 9 else f"every {snapshot_every}"
+        print(f"Recovery after 100000 changes, snapshot {label:<12}: {seconds * 1000:8.1f} ms")
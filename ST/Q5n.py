@@ -0,0 +1,68 @@
+import asyncio
+import sys
+import time
+
+from Q3e import Cart, FakeGateway, Inventory, Payment, PaymentQueue
+
+# -------------------------------
+# Checkout with payment: blocking gateway calls vs the batched PaymentQueue
+# -------------------------------
+# python Q5n.py [latency_ms]   (default: 10)
+
+n_checkouts = 1000
+latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 10.0) / 1000
+
+
+def new_inventory():
+    return Inventory({f"sku{i}": 10 ** 6 for i in range(100)})
+
+
+def percentile(latencies, fraction):
+    ordered = sorted(latencies)
+    return ordered[int(len(ordered) * fraction) - 1]
+
+
+def report(label, seconds, latencies):
+    print(f"{label:<34} {n_checkouts / seconds:8.0f} checkouts/s  "
+          f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms")
+
+
+def synchronous():
+    inventory = new_inventory()
+    payment = Payment(FakeGateway(latency))
+    latencies = []
+    start_time = time.time()
+    for i in range(n_checkouts):
+        began = time.perf_counter()
+        cart = Cart(inventory)
+        cart.add_item(f"sku{i % 100}", 1)
+        cart.checkout()
+        payment.process_payment(10, f"order{i}")
+        latencies.append(time.perf_counter() - began)
+    report("Synchronous", time.time() - start_time, latencies)
+
+
+async def asynchronous(max_batch, max_in_flight):
+    inventory = new_inventory()
+    payments = PaymentQueue(FakeGateway(latency), max_batch=max_batch, max_in_flight=max_in_flight)
+    latencies = []
+
+    async def checkout(i):
+        began = time.perf_counter()
+        cart = Cart(inventory)
+        cart.add_item(f"sku{i % 100}", 1)
+        await cart.checkout_async(payments, 10, f"order{i}")
+        latencies.append(time.perf_counter() - began)
+
+    start_time = time.time()
+    await asyncio.gather(*(checkout(i) for i in range(n_checkouts)))
+    await payments.close()
+    report(f"PaymentQueue, batch {max_batch}, {max_in_flight} in flight",
+           time.time() - start_time, latencies)
+
+
+if __name__ == "__main__":
+    print(f"{n_checkouts} checkouts, gateway latency {latency * 1000:.0f} ms per call")
+    synchronous()
+    for max_batch, max_in_flight in ((1, 8), (50, 1), (100, 8)):
+        asyncio.run(asynchronous(max_batch, max_in_flight))
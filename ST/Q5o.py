@@ -0,0 +1,95 @@
+import random
+import sys
+import time
+
+from Q4b import FeatureFlagSystem
+
+# -------------------------------
+# FeatureFlagSystem: evaluations/s at 1M users x 500 flags
+# -------------------------------
+# python Q5o.py [n_users]   (default: 1000000)
+
+n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+n_flags = 500
+assignments_per_user = 5
+n_checks = 1_000_000
+n_evaluate_all = 20_000
+
+
+class ListScanFlags:
+    """The previous implementation: one list of assigned features per user."""
+
+    def __init__(self):
+        self.features = {}
+        self.user_features = {}
+
+    def is_feature_enabled_for_user(self, user, feature_name):
+        return (
+            self.features.get(feature_name, False) and
+            feature_name in self.user_features.get(user, [])
+        )
+
+    def evaluate_all(self, user):
+        return {name: self.is_feature_enabled_for_user(user, name) for name in self.features}
+
+
+def build(rng):
+    system, baseline = FeatureFlagSystem(), ListScanFlags()
+    flags = [f"flag{i}" for i in range(n_flags)]
+    for i, name in enumerate(flags):
+        system.add_feature(name)
+        if i % 10:
+            system.enable_feature(name)
+        baseline.features[name] = bool(i % 10)
+        if i % 10 == 1:
+            system.set_rollout(name, 5 * (i % 7 + 1))
+    users = [f"user{i}" for i in range(n_users)]
+    for user in users:
+        picked = [flags[rng.randrange(n_flags)] for _ in range(assignments_per_user)]
+        for name in picked:
+            system.assign_feature_to_user(user, name)
+        baseline.user_features[user] = picked
+    return system, baseline, users, flags
+
+
+def with_repeats(baseline, times=4):
+    """The old API kept every assignment, so assigning a flag again grew the list."""
+    repeated = ListScanFlags()
+    repeated.features = baseline.features
+    repeated.user_features = {user: picked * times for user, picked in baseline.user_features.items()}
+    return repeated
+
+
+def measure(label, func, calls, per_call=1):
+    start_time = time.time()
+    func()
+    execution_time = time.time() - start_time
+    print(f"{label:<50} {calls / execution_time:12.0f} calls/s  {calls * per_call / execution_time:14.0f} flags/s")
+
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    start_time = time.time()
+    system, baseline, users, flags = build(rng)
+    print(f"{n_users} users x {n_flags} flags built in {time.time() - start_time:.1f} s")
+
+    pairs = [(rng.choice(users), rng.choice(flags)) for _ in range(n_checks)]
+    sample = [rng.choice(users) for _ in range(n_evaluate_all)]
+
+    # Both systems hold the same assignments; the last lines show the old
+    # lists after every flag was assigned four times
+    for name, flag_system in (("List scan", baseline), ("Bitsets", system)):
+        check = flag_system.is_feature_enabled_for_user
+        evaluate_all = flag_system.evaluate_all
+        measure(f"{name}: is_feature_enabled_for_user",
+                lambda: [check(user, flag) for user, flag in pairs], n_checks)
+        measure(f"{name}: evaluate_all", lambda: [evaluate_all(user) for user in sample],
+                n_evaluate_all, n_flags)
+    measure("Bitsets: enabled_features", lambda: [system.enabled_features(user) for user in sample],
+            n_evaluate_all, n_flags)
+
+    repeated = with_repeats(baseline)
+    measure("List scan, 4x repeats: is_feature_enabled_for_user",
+            lambda: [repeated.is_feature_enabled_for_user(user, flag) for user, flag in pairs], n_checks)
+    measure("List scan, 4x repeats: evaluate_all", lambda: [repeated.evaluate_all(user) for user in sample],
+            n_evaluate_all, n_flags)